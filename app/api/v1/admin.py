@@ -1,22 +1,48 @@
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Response, status
 from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date
+from app.core import metrics
 from app.core.database import get_db
-from app.core.permissions import require_admin
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.security import evict_user_tokens
+from app.core.permissions import CurrentUser, require_admin, invalidate_user
 from app.models.user import User
+from app.models.webhook import WebhookStatus
 from app.schemas.user import UserResponse
+from app.schemas.webhook import WebhookEventResponse
+from app.schemas.sales import SalesReport
+from app.services.sales_service import SalesService
+from app.services.webhook_service import WebhookService
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
 @router.get("/users", response_model=list[UserResponse])
 def list_users(
+    response: Response,
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, description="Keyset pagination: '' for the first page, then `X-Next-Cursor`"),
     db: Session = Depends(get_db),
-    admin: User = Depends(require_admin),   # 🔒 admins only
+    admin: CurrentUser = Depends(require_admin),   # 🔒 admins only
 ):
-    """**Admin only** — list all users."""
-    users = db.query(User).offset((page - 1) * page_size).limit(page_size).all()
+    """
+    **Admin only** — list all users.
+    In cursor mode the token for the next page is returned in the `X-Next-Cursor` header.
+    """
+    query = db.query(User).order_by(User.id)
+    if cursor is None:
+        users = query.offset((page - 1) * page_size).limit(page_size).all()
+        return [UserResponse.model_validate(u) for u in users]
+
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.filter(User.id > last_id)
+    rows = query.limit(page_size + 1).all()
+    users = rows[:page_size]
+    if len(rows) > page_size:
+        response.headers["X-Next-Cursor"] = encode_cursor(users[-1].id)
     return [UserResponse.model_validate(u) for u in users]
 
 
@@ -24,7 +50,7 @@ def list_users(
 def deactivate_user(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(require_admin),   # 🔒 admins only
+    admin: CurrentUser = Depends(require_admin),   # 🔒 admins only
 ):
     """**Admin only** — deactivate a user account."""
     from fastapi import HTTPException
@@ -34,6 +60,8 @@ def deactivate_user(
     user.is_active = False
     db.commit()
     db.refresh(user)
+    invalidate_user(user.id)
+    evict_user_tokens(user.id)
     return UserResponse.model_validate(user)
 
 
@@ -41,7 +69,7 @@ def deactivate_user(
 def activate_user(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(require_admin),   # 🔒 admins only
+    admin: CurrentUser = Depends(require_admin),   # 🔒 admins only
 ):
     """**Admin only** — re-activate a user account."""
     from fastapi import HTTPException
@@ -51,4 +79,45 @@ def activate_user(
     user.is_active = True
     db.commit()
     db.refresh(user)
-    return UserResponse.model_validate(user)
\ No newline at end of file
+    invalidate_user(user.id)
+    return UserResponse.model_validate(user)
+
+
+@router.get("/metrics")
+def get_metrics(admin: CurrentUser = Depends(require_admin)):   # 🔒 admins only
+    """**Admin only** — in-process counters (cache hit/miss ratios, …) for this worker."""
+    return metrics.snapshot()
+
+
+@router.get("/webhooks", response_model=list[WebhookEventResponse])
+def list_webhook_events(
+    event_status: WebhookStatus = Query(default=WebhookStatus.DEAD, alias="status"),
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    admin: CurrentUser = Depends(require_admin),   # 🔒 admins only
+):
+    """**Admin only** — Stripe webhook inbox, newest first (dead events by default)."""
+    return [WebhookEventResponse.model_validate(e) for e in WebhookService.list_events(db, event_status, limit)]
+
+
+@router.post("/webhooks/{event_id}/retry", response_model=WebhookEventResponse)
+def retry_webhook_event(
+    event_id: int,
+    db: Session = Depends(get_db),
+    admin: CurrentUser = Depends(require_admin),   # 🔒 admins only
+):
+    """**Admin only** — requeue a dead webhook event."""
+    return WebhookEventResponse.model_validate(WebhookService.retry(db, event_id))
+
+
+@router.get("/analytics/sales", response_model=SalesReport)
+def sales_analytics(
+    date_from: Optional[date] = Query(default=None, description="Inclusive (default: 30 days before date_to)"),
+    date_to: Optional[date] = Query(default=None, description="Inclusive (default: today, UTC)"),
+    seller_id: Optional[int] = None,
+    category: Optional[str] = None,
+    db: Session = Depends(get_db),
+    admin: CurrentUser = Depends(require_admin),   # 🔒 admins only
+):
+    """**Admin only** — platform sales per day, category and seller, from the `sales_rollups` aggregate."""
+    return SalesService.report(db, date_from, date_to, seller_id, category)
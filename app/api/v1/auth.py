@@ -1,11 +1,13 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.permissions import get_current_user
+from app.core.permissions import CurrentUser, get_current_user, get_current_user_record
+from app.core.security import get_token_payload
 from app.models.user import User
 from app.schemas.user import (
     UserCreate, UserLogin, UserUpdate, PasswordChange,
-    TokenResponse, UserResponse, RefreshRequest,
+    TokenResponse, UserResponse, RefreshRequest, LogoutRequest,
 )
 from app.services.auth_service import AuthService
 
@@ -41,7 +43,10 @@ def signin(data: UserLogin, db: Session = Depends(get_db)):
 
 @router.post("/refresh", response_model=TokenResponse)
 def refresh_tokens(data: RefreshRequest, db: Session = Depends(get_db)):
-    """Obtain new access + refresh tokens using a valid refresh token."""
+    """
+    Obtain new access + refresh tokens using a valid refresh token.
+    Refresh tokens are single-use: replaying one revokes every session of the user.
+    """
     access_token, refresh_token = AuthService.refresh(db, data.refresh_token)
     # Re-fetch user for response
     from app.core.security import decode_token
@@ -55,7 +60,7 @@ def refresh_tokens(data: RefreshRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
-def me(current_user: User = Depends(get_current_user)):
+def me(current_user: User = Depends(get_current_user_record)):
     """Get the currently authenticated user's profile."""
     return UserResponse.model_validate(current_user)
 
@@ -64,7 +69,7 @@ def me(current_user: User = Depends(get_current_user)):
 def update_profile(
     data: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_record),
 ):
     """Update the current user's profile (name, avatar)."""
     user = AuthService.update_profile(db, current_user, data)
@@ -75,16 +80,22 @@ def update_profile(
 def change_password(
     data: PasswordChange,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_record),
 ):
     """Change the current user's password."""
     AuthService.change_password(db, current_user, data)
 
 
 @router.post("/logout", status_code=status.HTTP_200_OK)
-def logout(current_user: User = Depends(get_current_user)):
+def logout(
+    data: Optional[LogoutRequest] = None,
+    claims: dict = Depends(get_token_payload),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
     """
-    Logout (stateless — token invalidation handled on the client).
-    For true server-side invalidation, implement a token blocklist (e.g. Redis).
+    Logout — revokes the access token (and the refresh token, if sent) server-side.
+    Other workers reject them within TOKEN_REVOCATION_SYNC_SECONDS.
     """
+    AuthService.logout(db, claims, data.refresh_token if data else None)
     return {"message": "Logged out successfully"}
\ No newline at end of file
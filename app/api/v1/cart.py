@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.permissions import get_current_user
-from app.models.user import User
+from app.core.permissions import CurrentUser, get_current_user
 from app.models.cart import Cart, CartItem
 from app.schemas.cart import CartItemAdd, CartItemUpdate, CartResponse, CartItemResponse
 from app.services.cart_service import CartService
@@ -37,7 +36,7 @@ def _build_cart_response(cart: Cart) -> CartResponse:
 @router.get("", response_model=CartResponse)
 def get_cart(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),   # 🔒 authenticated
+    current_user: CurrentUser = Depends(get_current_user),   # 🔒 authenticated
 ):
     """**Authenticated** — get the current user's cart."""
     cart = CartService.get_cart(db, current_user)
@@ -48,7 +47,7 @@ def get_cart(
 def add_item(
     data: CartItemAdd,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),   # 🔒 authenticated
+    current_user: CurrentUser = Depends(get_current_user),   # 🔒 authenticated
 ):
     """**Authenticated** — add a product to cart (or increase quantity if already present)."""
     cart = CartService.add_item(db, current_user, data)
@@ -60,7 +59,7 @@ def update_item(
     item_id: int,
     data: CartItemUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),   # 🔒 authenticated
+    current_user: CurrentUser = Depends(get_current_user),   # 🔒 authenticated
 ):
     """**Authenticated** — update quantity (set 0 to remove)."""
     cart = CartService.update_item(db, current_user, item_id, data)
@@ -70,7 +69,7 @@ def update_item(
 @router.delete("", status_code=status.HTTP_204_NO_CONTENT)
 def clear_cart(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),   # 🔒 authenticated
+    current_user: CurrentUser = Depends(get_current_user),   # 🔒 authenticated
 ):
     """**Authenticated** — remove all items from cart."""
     CartService.clear(db, current_user)
\ No newline at end of file
@@ -1,22 +1,39 @@
-from fastapi import APIRouter, Depends, Request, Header, status
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response, Header, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.permissions import get_current_user, require_admin
-from app.models.user import User
+from app.core.http_cache import is_not_modified, not_modified
+from app.core.permissions import CurrentUser, get_current_user, require_admin
+from app.models.order import OrderStatus
 from app.schemas.order import OrderResponse, CheckoutResponse, OrderStatusUpdate, PaymentResponse
 from app.services.order_service import OrderService
 from app.schemas.refund import RefundCreate, RefundResponse
 from app.services.refund_service import RefundService
+from app.services.idempotency_service import IdempotencyService, fingerprint
+from app.services.webhook_service import WebhookService
 
 router = APIRouter(tags=["Orders & Payments"])
 
 
 @router.post("/checkout", response_model=CheckoutResponse, status_code=status.HTTP_201_CREATED)
 def checkout(
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return OrderService.checkout(db, current_user)
+    """
+    Send an `Idempotency-Key` header to make retries safe: a repeated key
+    returns the first response instead of creating another order.
+    """
+    body, replayed = IdempotencyService.run(
+        db, idempotency_key, current_user.id, "checkout", fingerprint("checkout"),
+        lambda: OrderService.checkout(db, current_user).model_dump(mode="json"),
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
 
 
 @router.post("/webhooks/stripe", tags=["Webhooks"])
@@ -25,24 +42,50 @@ async def stripe_webhook(
     stripe_signature: str = Header(None),
     db: Session = Depends(get_db),
 ):
+    """Stores the verified event and acknowledges at once; processing is asynchronous (WebhookService)."""
     payload = await request.body()
-    return OrderService.handle_stripe_webhook(db, payload, stripe_signature or "")
+    return WebhookService.receive(db, payload, stripe_signature or "")
 
 
 @router.get("/orders", response_model=list[OrderResponse])
 def my_orders(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = Query(default=None, description="`X-Next-Cursor` of the previous page"),
+    order_status: Optional[OrderStatus] = Query(default=None, alias="status"),
+    created_from: Optional[datetime] = Query(default=None, description="Inclusive lower bound on `created_at`"),
+    created_to: Optional[datetime] = Query(default=None, description="Exclusive upper bound on `created_at`"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
-    return OrderService.get_user_orders(db, current_user)
+    """
+    The buyer's orders, newest first, `limit` per page.
+    The token for the next page is returned in the `X-Next-Cursor` header.
+    """
+    orders, next_cursor, etag = OrderService.get_user_orders(
+        db, current_user, limit, cursor, order_status, created_from, created_to
+    )
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [OrderResponse.model_validate(o) for o in orders]
 
 
 @router.get("/orders/{order_id}", response_model=OrderResponse)
 def get_order(
     order_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
+    etag = OrderService.get_order_etag(db, order_id, current_user)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return OrderService.get_order(db, order_id, current_user)
 
 
@@ -51,7 +94,7 @@ def update_order_status(
     order_id: int,
     data: OrderStatusUpdate,
     db: Session = Depends(get_db),
-    admin: User = Depends(require_admin),
+    admin: CurrentUser = Depends(require_admin),
 ):
     return OrderService.update_order_status(db, order_id, data, admin)
 
@@ -60,8 +103,21 @@ def update_order_status(
 def refund_order(
     order_id: int,
     data: RefundCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: Session = Depends(get_db),
-    admin: User = Depends(require_admin),
+    admin: CurrentUser = Depends(require_admin),
 ):
-    """**Admin only** — rembourser une commande (total ou partiel) via Stripe."""
-    return RefundService.create_refund(db, order_id, data, admin)
\ No newline at end of file
+    """
+    **Admin only** — rembourser une commande (total ou partiel) via Stripe.
+    Avec un header `Idempotency-Key`, un double envoi renvoie le premier remboursement.
+    """
+    body, replayed = IdempotencyService.run(
+        db, idempotency_key, admin.id, "refund", fingerprint("refund", order_id, data.model_dump()),
+        lambda: RefundResponse.model_validate(
+            RefundService.create_refund(db, order_id, data, admin, idempotency_key)
+        ).model_dump(mode="json"),
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
\ No newline at end of file
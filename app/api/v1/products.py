@@ -1,42 +1,130 @@
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import Optional
-from app.core.database import get_db
-from app.core.permissions import get_current_user, require_seller, require_admin
-from app.models.user import User
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductListResponse
+from typing import Optional, Literal
+from app.core.database import get_db, SessionLocal
+from app.core.http_cache import make_etag, is_not_modified, not_modified
+from app.core.permissions import CurrentUser, get_current_user, require_seller, require_admin
+from app.schemas.product import (
+    ProductCreate, ProductUpdate, ProductResponse, ProductListResponse,
+    ProductBatchRequest, ProductBatchResponse, MAX_BATCH_IDS, BulkImportReport, ProductFacetsResponse,
+)
 from app.services.product_service import ProductService
+from app.services.product_import_service import ProductImportService
+from app.services.export_service import ExportService
+from app.services.facet_service import FacetService
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 
 @router.get("", response_model=ProductListResponse)
 def list_products(
+    request: Request,
+    response: Response,
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=100),
     category: Optional[str] = None,
     search: Optional[str] = None,
     seller_id: Optional[int] = None,
+    cursor: Optional[str] = Query(default=None, description="Keyset pagination: '' for the first page, then `next_cursor`"),
+    total_mode: Literal["exact", "estimate", "none"] = "exact",
     db: Session = Depends(get_db),
 ):
     """
     Public — list all active products.
-    Supports pagination, category filter, keyword search, and seller filter.
+    Supports pagination (page or cursor), category filter, keyword search, and seller filter.
+    `total_mode=estimate|none` makes `total` approximate or skips it (infinite scroll).
+    Honours `If-None-Match` (content ETag).
     """
-    return ProductService.list_products(db, page, page_size, category, search, seller_id)
+    body, etag = ProductService.get_listing(db, page, page_size, category, search, seller_id, cursor, total_mode)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return body
+
+
+# ── Facets (declared before /{product_id}) ────────────────────────────────────
+@router.get("/facets", response_model=ProductFacetsResponse)
+def product_facets(
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    seller_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
+    """Public — active product counts per category, seller and price bucket for the current filters."""
+    return FacetService.get_facets(db, category, seller_id, search)
+
+
+# ── Catalogue export feed (declared before /{product_id}) ─────────────────────
+def _export_chunks(fmt: str, category: Optional[str], seller_id: Optional[int], gzip: bool):
+    # Own session: the stream outlives the request-scoped `get_db` session
+    db = SessionLocal()
+    try:
+        chunks = ExportService.iter_products(db, fmt, category, seller_id)
+        yield from ExportService.gzip_stream(chunks) if gzip else chunks
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_products(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    category: Optional[str] = None,
+    seller_id: Optional[int] = None,
+    gzip: bool = False,
+    admin: CurrentUser = Depends(require_admin),   # 🔒 admins only
+):
+    """**Admin only** — stream the whole active catalogue as NDJSON or CSV (optionally gzipped)."""
+    filename = f"catalogue.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("text/csv" if format == "csv" else "application/x-ndjson")
+    return StreamingResponse(
+        _export_chunks(format, category, seller_id, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# ── Batch lookup (declared before /{product_id}) ──────────────────────────────
+@router.get("/batch", response_model=ProductBatchResponse)
+def get_products_batch(
+    ids: str = Query(..., description=f"Comma-separated product ids (max {MAX_BATCH_IDS})"),
+    db: Session = Depends(get_db),
+):
+    """Public — fetch several products at once (cart, wishlist, order history)."""
+    try:
+        product_ids = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be comma-separated integers")
+    if not product_ids or len(product_ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Between 1 and {MAX_BATCH_IDS} ids required",
+        )
+    return ProductService.get_many(db, product_ids)
+
+
+@router.post("/batch", response_model=ProductBatchResponse)
+def post_products_batch(data: ProductBatchRequest, db: Session = Depends(get_db)):
+    """Public — same as `GET /products/batch`, ids in the request body."""
+    return ProductService.get_many(db, data.ids)
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    """Public — get a single product by ID."""
-    return ProductService.get_by_id(db, product_id)
+def get_product(product_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """Public — get a single product by ID. Honours `If-None-Match`."""
+    product = ProductService.get_public(db, product_id)
+    etag = make_etag(product.id, product.updated_at)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return product
 
 
 @router.post("", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
 def create_product(
     data: ProductCreate,
     db: Session = Depends(get_db),
-    current_seller: User = Depends(require_seller),   # 🔒 sellers only
+    current_seller: CurrentUser = Depends(require_seller),   # 🔒 sellers only
 ):
     """
     **Sellers only** — create a new product.
@@ -44,12 +132,36 @@ def create_product(
     return ProductService.create(db, data, current_seller)
 
 
+@router.post("/bulk", response_model=BulkImportReport)
+def bulk_import_products(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = Query(default=None, description="Defaults to the file extension"),
+    db: Session = Depends(get_db),
+    current_seller: CurrentUser = Depends(require_seller),   # 🔒 sellers only
+):
+    """
+    **Sellers only** — create or update products in bulk from a CSV or NDJSON file.
+    Rows with an `id` update that product (must be yours), rows without one create a product.
+    Returns per-row errors; valid rows are applied even when others fail.
+    """
+    fmt = format
+    if fmt is None:
+        filename = (file.filename or "").lower()
+        if filename.endswith(".csv") or file.content_type == "text/csv":
+            fmt = "csv"
+        elif filename.endswith((".ndjson", ".jsonl")) or file.content_type in ("application/x-ndjson", "application/jsonl"):
+            fmt = "ndjson"
+        else:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown file format, pass ?format=csv|ndjson")
+    return ProductImportService.import_products(db, file.file, fmt, current_seller)
+
+
 @router.patch("/{product_id}", response_model=ProductResponse)
 def update_product(
     product_id: int,
     data: ProductUpdate,
     db: Session = Depends(get_db),
-    current_seller: User = Depends(require_seller),   # 🔒 sellers only
+    current_seller: CurrentUser = Depends(require_seller),   # 🔒 sellers only
 ):
     """
     **Sellers only** — update one of your products.
@@ -62,7 +174,7 @@ def update_product(
 def delete_product(
     product_id: int,
     db: Session = Depends(get_db),
-    current_seller: User = Depends(require_seller),   # 🔒 sellers only
+    current_seller: CurrentUser = Depends(require_seller),   # 🔒 sellers only
 ):
     """
     **Sellers only** — soft-delete one of your products.
@@ -73,10 +185,17 @@ def delete_product(
 # ── Seller's own products ──────────────────────────────────────────────────────
 @router.get("/me/products", response_model=ProductListResponse)
 def my_products(
+    request: Request,
+    response: Response,
     page: int = Query(default=1, ge=1),
     page_size: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="Keyset pagination: '' for the first page, then `next_cursor`"),
     db: Session = Depends(get_db),
-    current_seller: User = Depends(require_seller),   # 🔒 sellers only
+    current_seller: CurrentUser = Depends(require_seller),   # 🔒 sellers only
 ):
     """**Sellers only** — list all your products (including inactive ones)."""
-    return ProductService.list_products(db, page, page_size, seller_id=current_seller.id)
\ No newline at end of file
+    body, etag = ProductService.get_listing(db, page, page_size, seller_id=current_seller.id, cursor=cursor)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return body
\ No newline at end of file
@@ -0,0 +1,77 @@
+from datetime import date, datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.core.database import get_db, SessionLocal
+from app.core.permissions import CurrentUser, require_seller
+from app.models.order import OrderStatus
+from app.schemas.order import SellerOrderItemResponse
+from app.schemas.sales import SalesReport
+from app.services.sales_service import SalesService
+from app.services.seller_service import SellerService
+
+router = APIRouter(prefix="/sellers", tags=["Sellers"])
+
+
+@router.get("/me/order-items", response_model=list[SellerOrderItemResponse])
+def my_order_items(
+    response: Response,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="`X-Next-Cursor` of the previous page"),
+    order_status: Optional[OrderStatus] = Query(default=None, alias="status"),
+    created_from: Optional[datetime] = Query(default=None, description="Inclusive lower bound on the order date"),
+    created_to: Optional[datetime] = Query(default=None, description="Exclusive upper bound on the order date"),
+    updated_since: Optional[datetime] = Query(default=None, description="Only orders changed since (incremental sync)"),
+    db: Session = Depends(get_db),
+    seller: CurrentUser = Depends(require_seller),
+):
+    """
+    **Seller** — lines of my products that were ordered, newest orders first.
+    The token for the next page is returned in the `X-Next-Cursor` header.
+    """
+    items, next_cursor = SellerService.list_order_items(
+        db, seller.id, limit, cursor, order_status, created_from, created_to, updated_since
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+def _order_item_chunks(seller_id: int, *filters):
+    # Own session: the stream outlives the request-scoped `get_db` session
+    db = SessionLocal()
+    try:
+        yield from SellerService.iter_order_items_ndjson(db, seller_id, *filters)
+    finally:
+        db.close()
+
+
+@router.get("/me/order-items/export")
+def export_my_order_items(
+    order_status: Optional[OrderStatus] = Query(default=None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    updated_since: Optional[datetime] = Query(default=None, description="Only orders changed since (incremental sync)"),
+    seller: CurrentUser = Depends(require_seller),
+):
+    """
+    **Seller** — every matching line as a streamed NDJSON feed (ERP sync).
+    Poll with `updated_since` = start time of the previous sync to fetch only changes.
+    """
+    return StreamingResponse(
+        _order_item_chunks(seller.id, order_status, created_from, created_to, updated_since),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/me/analytics", response_model=SalesReport)
+def my_sales_analytics(
+    date_from: Optional[date] = Query(default=None, description="Inclusive (default: 30 days before date_to)"),
+    date_to: Optional[date] = Query(default=None, description="Inclusive (default: today, UTC)"),
+    category: Optional[str] = None,
+    db: Session = Depends(get_db),
+    seller: CurrentUser = Depends(require_seller),
+):
+    """**Seller** — my units, gross revenue and refunds per day and category."""
+    return SalesService.report(db, date_from, date_to, seller.id, category)
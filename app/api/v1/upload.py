@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Depends, UploadFile, File, Request
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.permissions import require_seller
+from app.core.permissions import CurrentUser, require_seller
 from app.core.storage import save_product_image, delete_product_image
-from app.models.user import User
 from app.schemas.product import ProductResponse
 from app.services.product_service import ProductService
 
@@ -16,7 +15,7 @@ async def upload_product_image(
     request: Request,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_seller: User = Depends(require_seller),
+    current_seller: CurrentUser = Depends(require_seller),
 ):
     """
     **Sellers only** — upload ou remplace l'image principale d'un produit.
@@ -43,4 +42,5 @@ async def upload_product_image(
     product.image_url = image_url
     db.commit()
     db.refresh(product)
+    ProductService.invalidate(product.id)
     return product
\ No newline at end of file
@@ -8,7 +8,10 @@ from app.core.security import (
     decode_token,
 )
 from app.core.permissions import (
+    CurrentUser,
     get_current_user,
+    get_current_user_record,
+    invalidate_user,
     get_current_verified_user,
     require_seller,
     require_buyer,
@@ -0,0 +1,57 @@
+"""
+Periodic background jobs run by every worker process.
+
+Jobs are registered with `schedule` at import/startup time and run on
+daemon threads between `start_all` and `stop_all` (see the app lifespan).
+A failing run is logged and retried at the next tick.
+"""
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    def __init__(self, name: str, interval: float, fn: Callable[[], None]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"task-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.fn()
+            except Exception:
+                logger.exception("Background task %s failed", self.name)
+
+
+_tasks: list[PeriodicTask] = []
+
+
+def schedule(name: str, interval: float, fn: Callable[[], None]) -> PeriodicTask:
+    task = PeriodicTask(name, interval, fn)
+    _tasks.append(task)
+    return task
+
+
+def start_all() -> None:
+    for task in _tasks:
+        task.start()
+
+
+def stop_all() -> None:
+    for task in _tasks:
+        task.stop()
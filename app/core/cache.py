@@ -0,0 +1,210 @@
+"""
+Caching primitives.
+
+TTLCache      — in-process LRU with per-entry expiry (always available).
+MemoryBackend — namespaced key/value cache on top of TTLCache.
+RedisBackend  — shared cache for multi-worker deployments (needs `redis`).
+
+`create_cache()` picks the backend from `settings.CACHE_BACKEND` and
+registers hit/miss counters with app.core.metrics.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+from app.core import metrics
+from app.core.config import settings
+
+try:
+    import redis
+except ImportError:  # optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe bounded cache: entries expire after `ttl` seconds and the
+    least recently used entry is evicted once `maxsize` is reached.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every key for which `predicate(key)` is true. Returns the number dropped."""
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale:
+                del self._data[k]
+            return len(stale)
+
+    def invalidate_values(self, predicate: Callable[[Any], bool]) -> int:
+        """Like `invalidate`, but tests the cached values."""
+        with self._lock:
+            stale = [k for k, (_, value) in self._data.items() if predicate(value)]
+            for k in stale:
+                del self._data[k]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+# ── Key/value backends ────────────────────────────────────────────────────────
+class MemoryBackend:
+    """Per-process backend. Values are stored as-is (callers store JSON-able data)."""
+
+    def __init__(self, namespace: str, ttl: float, maxsize: int):
+        self.namespace = namespace
+        self._cache = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._counters: dict[str, int] = {}   # kept out of the LRU so they are never evicted
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        return self._cache.get(key)
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        found = {}
+        for key in keys:
+            value = self._cache.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        self._cache.set(key, value, ttl)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.delete(key)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class RedisBackend:
+    """Shared backend: values are JSON-encoded, keys prefixed with the namespace."""
+
+    def __init__(self, namespace: str, ttl: float, url: str):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the `redis` package")
+        self.namespace = namespace
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url)
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _count(self, found: int, total: int) -> None:
+        self.hits += found
+        self.misses += total - found
+
+    def get(self, key: str) -> Any:
+        raw = self._client.get(self._key(key))
+        self._count(raw is not None, 1)
+        return None if raw is None else json.loads(raw)
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        if not keys:
+            return {}
+        raws = self._client.mget([self._key(k) for k in keys])
+        found = {k: json.loads(raw) for k, raw in zip(keys, raws) if raw is not None}
+        self._count(len(found), len(keys))
+        return found
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        self._client.set(self._key(key), json.dumps(value), ex=int(self.ttl if ttl is None else ttl))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._client.delete(*(self._key(k) for k in keys))
+
+    def incr(self, key: str) -> int:
+        return int(self._client.incr(self._key(key)))
+
+    def counter(self, key: str) -> int:
+        return int(self._client.get(self._key(key)) or 0)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def create_cache(namespace: str, ttl: float, maxsize: int) -> MemoryBackend | RedisBackend:
+    """Build the configured cache backend and expose its counters as `cache.<namespace>`."""
+    backend: MemoryBackend | RedisBackend
+    if settings.CACHE_BACKEND == "redis" and settings.REDIS_URL:
+        backend = RedisBackend(namespace, ttl, settings.REDIS_URL)
+    else:
+        if settings.CACHE_BACKEND == "redis":
+            logger.warning("CACHE_BACKEND=redis but REDIS_URL is not set — using in-process cache")
+        backend = MemoryBackend(namespace, ttl, maxsize)
+    metrics.register(f"cache.{namespace}", backend.stats)
+    return backend
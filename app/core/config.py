@@ -19,6 +19,23 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    TOKEN_CACHE_SIZE: int = 100000              # verified access tokens kept per worker
+    TOKEN_REVOCATION_SYNC_SECONDS: int = 5      # max delay before a revocation reaches every worker
+
+    # ── Password hashing (Argon2) ─────────────────────────────────────────────
+    ARGON2_TIME_COST: int = 3                   # defaults = argon2-cffi's (RFC 9106 low-memory)
+    ARGON2_MEMORY_COST: int = 65536             # KiB
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # default: CPU count
+    PASSWORD_HASH_MAX_QUEUE: int = 8            # waiting calls before answering 503
+    # Sync routes run on anyio's threadpool (its default is 40 threads) and a login
+    # holds its thread while it waits for the hash, so logins in flight are also
+    # capped to a quarter of this pool: the rest stays free for every other route.
+    THREADPOOL_SIZE: int = 40
+
+    # ── Identity cache (get_current_user) ─────────────────────────────────────
+    IDENTITY_CACHE_TTL: int = 30                # seconds
+    IDENTITY_CACHE_SIZE: int = 50000
 
     # ── App ───────────────────────────────────────────────────────────────────
     DEBUG: bool = False
@@ -26,6 +43,25 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "SaaS Platform"
     VERSION: str = "1.0.0"
 
+    # ── Cache ─────────────────────────────────────────────────────────────────
+    CACHE_BACKEND: str = "memory"               # "memory" | "redis"
+    REDIS_URL: Optional[str] = None
+
+    # ── Rate limiting (requests per minute) ───────────────────────────────────
+    RATE_LIMIT_BACKEND: str = "memory"          # "memory" | "sqlite" (one host) | "redis" (REDIS_URL)
+    RATE_LIMIT_SQLITE_PATH: str = "rate_limits.db"
+    RATE_LIMIT_MAX_KEYS: int = 100000           # tracked clients per rule (memory backend)
+    RATE_LIMIT_DEFAULT: int = 120               # per user, or per IP when anonymous
+    RATE_LIMIT_AUTH: int = 10                   # signin / signup / refresh, per IP
+    RATE_LIMIT_CHECKOUT: int = 10               # per user
+
+    # ── Catalogue ─────────────────────────────────────────────────────────────
+    PRODUCT_COUNT_CACHE_TTL: int = 60           # seconds
+    PRODUCT_COUNT_CACHE_SIZE: int = 4096        # filter combinations kept
+    PRODUCT_CACHE_TTL: int = 300                # single product
+    PRODUCT_CACHE_SIZE: int = 10000
+    PRODUCT_LIST_CACHE_TTL: int = 30            # listing pages
+
     # ── CORS ──────────────────────────────────────────────────────────────────
     FRONTEND_URL: str = "https://shopwave-psi.vercel.app"
 
@@ -34,6 +70,21 @@ class Settings(BaseSettings):
     STRIPE_PUBLISHABLE_KEY: Optional[str] = None
     STRIPE_WEBHOOK_SECRET: Optional[str] = None
 
+    # ── Checkout ──────────────────────────────────────────────────────────────
+    CHECKOUT_RECOVERY_SECONDS: int = 300        # order without PaymentIntent after this → cancelled
+    CHECKOUT_RECOVERY_INTERVAL: int = 60
+    IDEMPOTENCY_KEY_TTL: int = 86400            # seconds a checkout / refund response is replayable
+    PENDING_ORDER_TTL: int = 1800               # unpaid order → cancelled, stock released
+    RESERVATION_SWEEP_INTERVAL: int = 60
+    RESERVATION_SWEEP_BATCH: int = 200
+    RESERVATION_RECHECK_SECONDS: int = 900      # wait before re-asking Stripe about an intent it wouldn't cancel
+
+    # ── Stripe webhook inbox ──────────────────────────────────────────────────
+    WEBHOOK_POLL_INTERVAL: float = 1.0          # seconds between inbox drains
+    WEBHOOK_BATCH_SIZE: int = 50
+    WEBHOOK_WORKERS: int = 4
+    WEBHOOK_MAX_ATTEMPTS: int = 10              # then DEAD (exponential backoff, capped at 1 h)
+
     model_config = {
         "env_file": ".env",
         "case_sensitive": True,
@@ -0,0 +1,34 @@
+"""
+Conditional GET helpers (ETag / If-None-Match → 304 Not Modified).
+"""
+import hashlib
+import json
+from typing import Any
+from fastapi import Request, Response, status
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from version components, e.g. `make_etag(product.id, product.updated_at)`."""
+    raw = "|".join(p.isoformat() if hasattr(p, "isoformat") else str(p) for p in parts)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def content_etag(payload: Any) -> str:
+    """Strong ETag from a JSON-able payload (used for listings)."""
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: ignore any W/ prefix
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
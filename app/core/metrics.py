@@ -0,0 +1,17 @@
+"""
+Minimal in-process metrics registry.
+
+Components register a zero-argument callable returning a dict of counters;
+`snapshot()` collects them all (served by GET /admin/metrics).
+"""
+from typing import Callable
+
+_providers: dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, provider: Callable[[], dict]) -> None:
+    _providers[name] = provider
+
+
+def snapshot() -> dict[str, dict]:
+    return {name: provider() for name, provider in sorted(_providers.items())}
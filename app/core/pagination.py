@@ -0,0 +1,33 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token wrapping the sort key of the last row
+of a page, e.g. `(created_at, id)`. The next page is fetched with a seek
+predicate (`WHERE (created_at, id) < (:created_at, :id)`) instead of OFFSET,
+so every page costs the same and concurrent inserts don't shift results.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, *types: type) -> tuple:
+    """Decode a cursor produced by `encode_cursor`, coercing each value to `types`."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(types):
+            raise ValueError("cursor arity mismatch")
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
@@ -4,29 +4,81 @@ Role-based access control (RBAC).
 Usage in endpoints:
     @router.get("/...", dependencies=[Depends(require_seller)])
     # or
-    current_user: User = Depends(require_seller)
+    current_user: CurrentUser = Depends(require_seller)
+
+`get_current_user` returns a cached `CurrentUser` snapshot (id, role, flags)
+so authenticated requests don't query `users`. Routes that need the full
+row (profile, password) use `get_current_user_record`. Any write to those
+fields must call `invalidate_user`; with the in-process cache other workers
+pick the change up within IDENTITY_CACHE_TTL.
 """
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from app.core.cache import create_cache
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import get_token_payload
 from app.models.user import User, UserRole
 
 
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+
+
+_identity_cache = create_cache("identities", ttl=settings.IDENTITY_CACHE_TTL, maxsize=settings.IDENTITY_CACHE_SIZE)
+
+
+def _identity_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def invalidate_user(user_id: int) -> None:
+    """Forget the cached identity of `user_id` (role / status / profile changed)."""
+    _identity_cache.delete(_identity_key(user_id))
+
+
 # ── Base user dependency ──────────────────────────────────────────────────────
 def get_current_user(
     payload: dict = Depends(get_token_payload),
     db: Session = Depends(get_db),
+) -> CurrentUser:
+    key = _identity_key(payload["user_id"])
+    snapshot = _identity_cache.get(key)
+    if snapshot is None:
+        user = db.query(User).filter(User.id == payload["user_id"]).first()
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        snapshot = {
+            "id": user.id,
+            "role": user.role.value,
+            "is_active": user.is_active,
+            "is_verified": user.is_verified,
+        }
+        _identity_cache.set(key, snapshot)
+
+    current_user = CurrentUser(**{**snapshot, "role": UserRole(snapshot["role"])})
+    if not current_user.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive account")
+    return current_user
+
+
+def get_current_user_record(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ) -> User:
-    user = db.query(User).filter(User.id == payload["user_id"]).first()
+    """Full `User` row of the caller, for the few routes that read or modify it."""
+    user = db.query(User).filter(User.id == current_user.id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    if not user.is_active:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive account")
     return user
 
 
-def get_current_verified_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_verified_user(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if not current_user.is_verified:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -36,7 +88,7 @@ def get_current_verified_user(current_user: User = Depends(get_current_user)) ->
 
 
 # ── Role-specific dependencies ────────────────────────────────────────────────
-def require_seller(current_user: User = Depends(get_current_user)) -> User:
+def require_seller(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if current_user.role not in (UserRole.SELLER, UserRole.ADMIN):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -45,7 +97,7 @@ def require_seller(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-def require_buyer(current_user: User = Depends(get_current_user)) -> User:
+def require_buyer(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if current_user.role not in (UserRole.BUYER, UserRole.ADMIN):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -54,10 +106,10 @@ def require_buyer(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-def require_admin(current_user: User = Depends(get_current_user)) -> User:
+def require_admin(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin privileges required",
         )
-    return current_user
\ No newline at end of file
+    return current_user
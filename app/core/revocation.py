@@ -0,0 +1,61 @@
+"""
+In-process token blocklist.
+
+`get_token_payload` checks every token against it with two dict lookups —
+no database query per request. The source of truth is the
+`token_revocations` table: revocations are applied locally right away and
+reach the other workers at the next `TokenService.sync`, which runs every
+TOKEN_REVOCATION_SYNC_SECONDS (the propagation bound).
+
+Entries are dropped once the tokens they target have expired, so the size
+is bounded by the number of revocations within one refresh-token lifetime.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from app.core import metrics
+
+
+def timestamp(value: datetime) -> float:
+    """POSIX timestamp of a DB datetime (SQLite hands back naive UTC values)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class RevocationList:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jtis: dict[str, float] = {}                        # jti → token exp
+        self._cutoffs: dict[int, tuple[float, float]] = {}       # user id → (revoked before, expires)
+
+    def revoke(self, jti: str, exp: float) -> None:
+        with self._lock:
+            self._jtis[jti] = exp
+
+    def revoke_user(self, user_id: int, before: float, expires: float) -> None:
+        with self._lock:
+            current = self._cutoffs.get(user_id)
+            if current is None or current[0] < before:
+                self._cutoffs[user_id] = (before, expires)
+
+    def is_revoked(self, claims: dict) -> bool:
+        jti = claims.get("jti")
+        if jti is not None and jti in self._jtis:
+            return True
+        cutoff = self._cutoffs.get(claims["user_id"])
+        # `iat` has one-second resolution: tokens issued during the cutoff second survive
+        return cutoff is not None and claims.get("iat", 0) < int(cutoff[0])
+
+    def prune(self, now: float | None = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            self._jtis = {j: exp for j, exp in self._jtis.items() if exp > now}
+            self._cutoffs = {u: c for u, c in self._cutoffs.items() if c[1] > now}
+
+    def stats(self) -> dict:
+        return {"revoked_tokens": len(self._jtis), "revoked_users": len(self._cutoffs)}
+
+
+blocklist = RevocationList()
+metrics.register("token_revocations", blocklist.stats)
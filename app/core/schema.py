@@ -0,0 +1,63 @@
+"""
+Schema upkeep for databases created by an earlier version.
+
+Tables come from `Base.metadata.create_all`, which skips tables that already
+exist: an index declared on a model after its table first shipped never
+reaches an existing database. `upgrade` adds them at startup with
+`CREATE INDEX IF NOT EXISTS`, and likewise adds missing nullable columns
+(`ALTER TABLE ... ADD COLUMN`). Several workers run it at once, so losing
+the race to another worker ("already exists") is logged and ignored.
+"""
+import logging
+from sqlalchemy import Engine, Table, inspect
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_indexes(engine: Engine, *tables: Table) -> None:
+    """Create every index declared on `tables` that the database doesn't have yet."""
+    for table in tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+            except DBAPIError as e:
+                logger.warning("Could not create index %s: %s", index.name, e.orig)
+
+
+def ensure_columns(engine: Engine, table: Table, *names: str, backfill: str | None = None) -> None:
+    """
+    Add the nullable columns `names` of `table` when the database lacks them.
+    `backfill` (SQL) runs once, in the transaction that adds the columns.
+    """
+    existing = {c["name"] for c in inspect(engine).get_columns(table.name)}
+    for name in names:
+        column = table.c[name]
+        if name in existing:
+            continue
+        assert column.nullable, f"{table.name}.{name}: only nullable columns can be added to a live table"
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(dialect=engine.dialect)}"
+        try:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(ddl)
+                if backfill:
+                    conn.exec_driver_sql(backfill)
+        except DBAPIError as e:
+            logger.warning("Could not add column %s.%s: %s", table.name, name, e.orig)
+
+
+def upgrade(engine: Engine) -> None:
+    """Bring an existing database up to the models. Idempotent; run after `create_all`."""
+    from app.models.order import Order, OrderItem
+    from app.models.product import Product
+
+    ensure_columns(engine, Order.__table__, "sweep_check_at")
+    # Lines sold before the snapshot existed take their product's category as of the upgrade
+    ensure_columns(
+        engine, OrderItem.__table__, "category",
+        backfill="UPDATE order_items SET category = "
+                 "(SELECT category FROM products WHERE products.id = order_items.product_id)",
+    )
+    ensure_indexes(engine, Product.__table__, Order.__table__, OrderItem.__table__)
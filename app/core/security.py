@@ -1,31 +1,98 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Any
+from typing import Optional, Any, Callable, TypeVar
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from app.core import metrics
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.revocation import blocklist
+
+T = TypeVar("T")
 
 # ── Password hashing ──────────────────────────────────────────────────────────
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Hashes made with other cost parameters are flagged by `needs_update` and
+# transparently re-hashed at the next successful login.
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/signin")
 
+# Argon2 runs on a dedicated, bounded pool (argon2-cffi releases the GIL). The
+# calling sync route keeps its anyio threadpool thread while it waits, so the
+# number of hashing calls in flight (running + queued) is capped at
+# workers + PASSWORD_HASH_MAX_QUEUE, and never more than a quarter of
+# THREADPOOL_SIZE: a burst of logins can't starve the other sync endpoints.
+# Beyond the cap we shed load with a 503.
+_hash_workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+_hash_capacity = max(1, min(_hash_workers + settings.PASSWORD_HASH_MAX_QUEUE, settings.THREADPOOL_SIZE // 4))
+_hash_executor = ThreadPoolExecutor(max_workers=min(_hash_workers, _hash_capacity), thread_name_prefix="argon2")
+_hash_slots = threading.BoundedSemaphore(_hash_capacity)
+_hash_stats = {"completed": 0, "rejected": 0}
+_hash_stats_lock = threading.Lock()   # bumped from every request thread at once
+
+
+def _count_hashing(outcome: str) -> None:
+    with _hash_stats_lock:
+        _hash_stats[outcome] += 1
+
+
+def _hashing_stats() -> dict:
+    with _hash_stats_lock:
+        return {"workers": _hash_workers, "capacity": _hash_capacity, **_hash_stats}
+
+
+metrics.register("password_hashing", _hashing_stats)
+
+
+def _run_hashing(fn: Callable[..., T], *args: Any) -> T:
+    if not _hash_slots.acquire(blocking=False):
+        _count_hashing("rejected")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return _hash_executor.submit(fn, *args).result()
+    finally:
+        _hash_slots.release()
+        _count_hashing("completed")
+
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return _run_hashing(pwd_context.hash, password)
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return _run_hashing(pwd_context.verify, plain, hashed)
+
+
+def verify_and_update_password(plain: str, hashed: str) -> tuple[bool, Optional[str]]:
+    """Verify `plain`; on success also return a new hash if `hashed` uses outdated cost parameters."""
+    return _run_hashing(pwd_context.verify_and_update, plain, hashed)
 
 
 # ── JWT ───────────────────────────────────────────────────────────────────────
 def _create_token(subject: Any, expires_delta: timedelta, token_type: str = "access") -> str:
-    expire = datetime.now(timezone.utc) + expires_delta
+    now = datetime.now(timezone.utc)
     payload = {
         "sub": str(subject),
-        "exp": expire,
+        "exp": now + expires_delta,
+        "iat": now,
+        "jti": uuid.uuid4().hex,   # identifies the token in the revocation list
         "type": token_type,
     }
     return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
@@ -55,17 +122,90 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
+# ── Verified-token cache ──────────────────────────────────────────────────────
+# sha256(token) → verified claims, kept until the token's own `exp`.
+# Process-local on purpose: bearer tokens never leave the worker.
+_token_cache = TTLCache(ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, maxsize=settings.TOKEN_CACHE_SIZE)
+_decode_stats = {"decodes": 0, "decode_seconds": 0.0}
+
+
+def _token_cache_stats() -> dict:
+    stats = _token_cache.stats()
+    decodes = _decode_stats["decodes"]
+    avg = _decode_stats["decode_seconds"] / decodes if decodes else 0.0
+    return {
+        **stats,
+        "avg_decode_ms": round(avg * 1000, 4),
+        "time_saved_ms": round(stats["hits"] * avg * 1000, 1),
+    }
+
+
+metrics.register("jwt_cache", _token_cache_stats)
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def evict_token(token: str) -> None:
+    _token_cache.delete(_token_digest(token))
+
+
+def evict_user_tokens(user_id: int) -> int:
+    """Drop every cached token of `user_id` (deactivation, revocation)."""
+    return _token_cache.invalidate_values(lambda claims: claims["user_id"] == user_id)
+
+
 # ── Dependency helpers ────────────────────────────────────────────────────────
 def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    digest = _token_digest(token)
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    claims = _token_cache.get(digest)
+    if claims is not None:
+        if blocklist.is_revoked(claims):
+            raise credentials_exception
+        return dict(claims)
+
+    started = time.perf_counter()
     payload = decode_token(token)
+    _decode_stats["decodes"] += 1
+    _decode_stats["decode_seconds"] += time.perf_counter() - started
+
     if payload is None or payload.get("type") != "access":
         raise credentials_exception
     user_id: str = payload.get("sub")
     if user_id is None:
         raise credentials_exception
-    return {"user_id": int(user_id)}
\ No newline at end of file
+
+    claims = {
+        "user_id": int(user_id),
+        "exp": payload["exp"],
+        "iat": payload.get("iat", 0),
+        "jti": payload.get("jti"),
+    }
+    if blocklist.is_revoked(claims):
+        raise credentials_exception
+    ttl = payload["exp"] - time.time()
+    if ttl > 0:
+        _token_cache.set(digest, claims, ttl=ttl)
+    return dict(claims)
+
+
+def peek_user_id(token: str) -> int | None:
+    """User id of a valid access token, None otherwise (never raises). May decode: call off the event loop."""
+    try:
+        return get_token_payload(token)["user_id"]
+    except HTTPException:
+        return None
+
+
+def peek_cached_user_id(token: str) -> int | None:
+    """Like `peek_user_id` but cache only (no JWT decode): safe on the event loop."""
+    claims = _token_cache.get(_token_digest(token))
+    if claims is None or blocklist.is_revoked(claims):
+        return None
+    return claims["user_id"]
@@ -25,4 +25,26 @@ def init_stripe() -> bool:
         return False
     except Exception as e:
         logger.error(f"❌ Erreur Stripe au démarrage : {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def cancel_payment_intent(intent_id: str) -> str | None:
+    """
+    Annule un PaymentIntent. Retourne son statut : "canceled" s'il est (ou
+    était déjà) annulé, sinon le statut qui l'en empêche ("succeeded",
+    "processing", "requires_capture"…) ; None si Stripe est injoignable ou
+    l'intent introuvable.
+    """
+    try:
+        return stripe.PaymentIntent.cancel(intent_id).status
+    except stripe.InvalidRequestError:
+        pass   # déjà annulé, ou plus annulable : on regarde son statut
+    except stripe.StripeError as e:
+        logger.warning(f"Annulation du PaymentIntent {intent_id} impossible : {e}")
+        return None
+    try:
+        return stripe.PaymentIntent.retrieve(intent_id).status
+    except stripe.StripeError as e:
+        # Intent inconnu (supprimé, autre compte…) ou Stripe injoignable
+        logger.warning(f"PaymentIntent {intent_id} illisible : {e}")
+        return None
@@ -0,0 +1,45 @@
+"""
+Request counters and latency, as a raw ASGI middleware.
+
+Counts requests per status class and accumulates the time to the start of
+the response (served by GET /admin/metrics under "http"). Adds a
+`Server-Timing: app;dur=<ms>` header so clients can see server time.
+"""
+import time
+from collections import Counter
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core import metrics
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._counts: Counter = Counter()
+        self._seconds = 0.0
+        metrics.register("http", self.stats)
+
+    def stats(self) -> dict:
+        total = sum(self._counts.values())
+        return {
+            "requests": total,
+            **{f"status_{k}": v for k, v in sorted(self._counts.items())},
+            "avg_ms": round(self._seconds / total * 1000, 3) if total else 0.0,
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+
+        async def send_timed(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - started
+                self._seconds += elapsed
+                self._counts[f"{message['status'] // 100}xx"] += 1
+                MutableHeaders(scope=message).append("Server-Timing", f"app;dur={elapsed * 1000:.1f}")
+            await send(message)
+
+        await self.app(scope, receive, send_timed)
@@ -1,37 +1,177 @@
 """
-Simple in-process rate limiter.
-For production, replace with Redis-based rate limiting (e.g. slowapi + Redis).
+Rate limiting middleware.
+
+Each request is checked against every matching `RateLimitRule` (most
+specific first, the catch-all last) and rejected with 429 at the first rule
+that is exhausted. Rules count per client IP or per authenticated user
+(falling back to the IP for anonymous calls).
+
+Counters live in a pluggable backend (see rate_limit_backends), selected
+by RATE_LIMIT_BACKEND: "memory" per worker, "sqlite" shared by the workers
+of one host, "redis" shared by every host. If the backend is unreachable
+requests are let through (fail open): failures are counted in the
+`rate_limit` metrics and logged when the backend goes down, every
+ERROR_LOG_INTERVAL seconds while it stays down, and when it recovers.
+
+Responses carry `RateLimit-Limit` / `RateLimit-Remaining` / `RateLimit-Reset`
+for the tightest matching rule, plus `Retry-After` on 429.
+
+Written as a raw ASGI middleware (no BaseHTTPMiddleware): the request goes
+straight to the app, headers are added to the `http.response.start`
+message, and streaming responses pass through untouched.
 """
+import logging
 import time
-from collections import defaultdict
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
-
-
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, max_requests: int = 100, window_seconds: int = 60):
-        super().__init__(app)
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self._store: dict[str, list[float]] = defaultdict(list)
-
-    async def dispatch(self, request: Request, call_next):
-        # ✅ Laisser passer les requêtes preflight CORS
-        if request.method == "OPTIONS":
-            return await call_next(request)
-
-        client_ip = request.client.host if request.client else "unknown"
-        now = time.time()
-        window_start = now - self.window_seconds
-
-        # Clean old requests
-        self._store[client_ip] = [t for t in self._store[client_ip] if t > window_start]
-
-        if len(self._store[client_ip]) >= self.max_requests:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Too many requests. Please slow down.",
+from collections import Counter
+from dataclasses import dataclass
+from typing import Literal
+from fastapi import status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core import metrics
+from app.core.config import settings
+from app.core.security import peek_user_id, peek_cached_user_id
+from app.middleware.rate_limit_backends import (  # noqa: F401 (re-exported)
+    RateLimitBackend, RateLimitResult, SlidingWindowLimiter, create_rate_limit_backend,
+)
+
+logger = logging.getLogger(__name__)
+
+ERROR_LOG_INTERVAL = 60   # seconds between two "backend still down" log lines
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    limit: int
+    window_seconds: int = 60
+    paths: tuple[str, ...] = ()            # path prefixes; empty = every path
+    methods: frozenset[str] = frozenset()  # empty = every method
+    per: Literal["ip", "user"] = "ip"
+
+    def matches(self, method: str, path: str) -> bool:
+        return (not self.methods or method in self.methods) and (
+            not self.paths or any(path.startswith(p) for p in self.paths)
+        )
+
+
+def default_rules() -> list[RateLimitRule]:
+    api = settings.API_V1_STR
+    return [
+        RateLimitRule(
+            "auth", settings.RATE_LIMIT_AUTH,
+            paths=(f"{api}/auth/signin", f"{api}/auth/signup", f"{api}/auth/refresh"),
+            methods=frozenset({"POST"}),
+        ),
+        RateLimitRule(
+            "checkout", settings.RATE_LIMIT_CHECKOUT,
+            paths=(f"{api}/checkout",), methods=frozenset({"POST"}), per="user",
+        ),
+        RateLimitRule("default", settings.RATE_LIMIT_DEFAULT, per="user"),
+    ]
+
+
+async def _user_id(scope: Scope) -> int | None:
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    user_id = peek_cached_user_id(token)
+    if user_id is None:
+        # Cache miss (first request of this token on this worker): the JWT decode stays off the event loop
+        user_id = await run_in_threadpool(peek_user_id, token)
+    return user_id
+
+
+def _client_key(rule: RateLimitRule, scope: Scope, user_id: int | None) -> str:
+    if rule.per == "user" and user_id is not None:
+        return f"user:{user_id}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, rules: list[RateLimitRule] | None = None, backend: RateLimitBackend | None = None):
+        self.app = app
+        self.rules = default_rules() if rules is None else rules
+        self.backend = create_rate_limit_backend() if backend is None else backend
+        self._stats: Counter = Counter()
+        self._failing_since: float | None = None   # backend down since (monotonic), None when healthy
+        self._failures_unlogged = 0
+        self._last_error_log = 0.0
+        metrics.register("rate_limit", self.stats)
+
+    def stats(self) -> dict:
+        return {**self.backend.stats(), **self._stats}
+
+    async def _hit(self, rule: RateLimitRule, key: str) -> RateLimitResult | None:
+        try:
+            if self.backend.blocking:
+                result = await run_in_threadpool(self.backend.hit, rule.name, key, rule.limit, rule.window_seconds)
+            else:
+                result = self.backend.hit(rule.name, key, rule.limit, rule.window_seconds)
+        except Exception as e:
+            self._backend_failed(e)
+            return None
+        if self._failing_since is not None:
+            logger.warning("Rate limit backend recovered after %.0fs", time.monotonic() - self._failing_since)
+            self._failing_since = None
+            self._failures_unlogged = 0
+        return result
+
+    def _backend_failed(self, error: Exception) -> None:
+        """Count every failure; log on the way down, then at most once per ERROR_LOG_INTERVAL."""
+        self._stats["backend_errors"] += 1
+        self._failures_unlogged += 1
+        now = time.monotonic()
+        if self._failing_since is None:
+            self._stats["backend_outages"] += 1
+            self._failing_since = self._last_error_log = now
+            self._failures_unlogged = 0
+            logger.exception("Rate limit backend failed — letting requests through until it recovers")
+        elif now - self._last_error_log >= ERROR_LOG_INTERVAL:
+            logger.error(
+                "Rate limit backend still failing (%d failed calls in the last %.0fs): %s",
+                self._failures_unlogged, now - self._last_error_log, error,
             )
+            self._last_error_log = now
+            self._failures_unlogged = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # ✅ Laisser passer les requêtes preflight CORS (et websocket / lifespan)
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        rules = [rule for rule in self.rules if rule.matches(scope["method"], scope["path"])]
+        user_id = await _user_id(scope) if any(rule.per == "user" for rule in rules) else None
+        tightest: RateLimitResult | None = None
+        for rule in rules:
+            result = await self._hit(rule, _client_key(rule, scope, user_id))
+            if result is None:
+                continue
+            if not result.allowed:
+                self._stats[f"rejected.{rule.name}"] += 1
+                response = JSONResponse(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    content={"detail": "Too many requests. Please slow down."},
+                    headers=result.headers(),
+                )
+                await response(scope, receive, send)
+                return
+            if tightest is None or result.remaining < tightest.remaining:
+                tightest = result
+
+        if tightest is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = tightest.headers()
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
 
-        self._store[client_ip].append(now)
-        return await call_next(request)
\ No newline at end of file
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,249 @@
+"""
+Rate-limit state backends.
+
+Every backend implements the same sliding-window counter (see `evaluate`)
+and exposes `hit(namespace, key, limit, window_seconds) -> RateLimitResult`:
+
+MemoryRateLimitBackend — per process (one uvicorn worker = its own counters).
+SQLiteRateLimitBackend — one SQLite file shared by the workers of a host.
+RedisRateLimitBackend  — shared across hosts (needs `redis`); only uses
+                         INCR / EXPIRE / GET / DECR, so any Redis-protocol
+                         server will do.
+
+`blocking` tells the middleware to call `hit` from the threadpool.
+"""
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+from app.core.config import settings
+
+try:
+    import redis
+except ImportError:  # optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int          # seconds until the current window ends
+    retry_after: int    # seconds before a new request can succeed (0 when allowed)
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+
+def evaluate(current: int, previous: int, elapsed: float, limit: int, window_seconds: int) -> RateLimitResult:
+    """
+    Sliding-window decision for one more request, given the counts of the
+    current and previous fixed windows and the time spent in the current one.
+    The rolling count is estimated as `previous × (remaining share of the window) + current`.
+    """
+    estimated = previous * (1 - elapsed / window_seconds) + current
+    reset = max(math.ceil(window_seconds - elapsed), 1)
+    if estimated + 1 <= limit:
+        return RateLimitResult(True, limit, max(int(limit - estimated - 1), 0), reset, 0)
+
+    if current + 1 > limit or previous == 0:
+        retry_after = reset
+    else:
+        # Solve previous × (1 - t / window) = limit - current - 1 for t
+        retry_after = max(math.ceil(window_seconds * (1 - (limit - current - 1) / previous) - elapsed), 1)
+    return RateLimitResult(False, limit, 0, reset, retry_after)
+
+
+def _split(now: float, window_seconds: int) -> tuple[int, float]:
+    """(index of the fixed window containing `now`, seconds elapsed in it)"""
+    window = int(now // window_seconds)
+    return window, now - window * window_seconds
+
+
+class SlidingWindowLimiter:
+    """
+    In-process counters for one limit. Keys live in an LRU capped at
+    `max_keys`; keys idle for two full windows hold no information and are
+    evicted lazily from the cold end of the LRU, at most once per window.
+    """
+
+    def __init__(self, max_requests: int, window_seconds: int, max_keys: int = 100_000):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        # key → [window index, count in that window, count in the window before]
+        self._windows: OrderedDict[str, list[int]] = OrderedDict()
+        self._last_sweep = 0
+
+    def hit(self, key: str, now: float | None = None) -> RateLimitResult:
+        window, elapsed = _split(time.time() if now is None else now, self.window_seconds)
+        if window > self._last_sweep:
+            self._evict_idle(window)
+
+        entry = self._windows.get(key)
+        if entry is None:
+            entry = [window, 0, 0]
+            self._windows[key] = entry
+            if len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(key)
+            if entry[0] != window:
+                # Roll over: the previous window only counts if it is the one just before
+                entry[2] = entry[1] if entry[0] == window - 1 else 0
+                entry[0], entry[1] = window, 0
+
+        result = evaluate(entry[1], entry[2], elapsed, self.max_requests, self.window_seconds)
+        if result.allowed:
+            entry[1] += 1
+        return result
+
+    def _evict_idle(self, window: int) -> None:
+        """Drop keys unseen since before the previous window (LRU order: oldest first)."""
+        self._last_sweep = window
+        while self._windows:
+            key, entry = next(iter(self._windows.items()))
+            if entry[0] >= window - 1:
+                break
+            del self._windows[key]
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+class MemoryRateLimitBackend:
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._limiters: dict[tuple[str, int, int], SlidingWindowLimiter] = {}
+
+    def hit(self, namespace: str, key: str, limit: int, window_seconds: int, now: float | None = None) -> RateLimitResult:
+        limiter = self._limiters.get((namespace, limit, window_seconds))
+        if limiter is None:
+            limiter = SlidingWindowLimiter(limit, window_seconds, self.max_keys)
+            self._limiters[(namespace, limit, window_seconds)] = limiter
+        return limiter.hit(key, now)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "keys": sum(len(l) for l in self._limiters.values())}
+
+
+class SQLiteRateLimitBackend:
+    """
+    Counters in a local SQLite file (WAL) shared by every worker of the host.
+    Each hit is one short `BEGIN IMMEDIATE` transaction; rows whose windows
+    are over are swept once a minute.
+    """
+    blocking = True
+
+    _DDL = (
+        "CREATE TABLE IF NOT EXISTS rate_limits ("
+        " key TEXT PRIMARY KEY, window INTEGER NOT NULL, current INTEGER NOT NULL,"
+        " previous INTEGER NOT NULL, expires_at REAL NOT NULL)"
+    )
+    _SWEEP_INTERVAL = 60
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()   # sqlite3 connections are per thread
+        self._last_sweep = 0.0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")   # counters, not business data
+            conn.execute(self._DDL)
+            self._local.conn = conn
+        return conn
+
+    def hit(self, namespace: str, key: str, limit: int, window_seconds: int, now: float | None = None) -> RateLimitResult:
+        now = time.time() if now is None else now
+        window, elapsed = _split(now, window_seconds)
+        row_key = f"{namespace}:{key}"
+        conn = self._conn()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if now - self._last_sweep > self._SWEEP_INTERVAL:
+                self._last_sweep = now
+                conn.execute("DELETE FROM rate_limits WHERE expires_at < ?", (now,))
+            row = conn.execute("SELECT window, current, previous FROM rate_limits WHERE key = ?", (row_key,)).fetchone()
+            current, previous = 0, 0
+            if row is not None:
+                if row[0] == window:
+                    current, previous = row[1], row[2]
+                elif row[0] == window - 1:
+                    previous = row[1]
+            result = evaluate(current, previous, elapsed, limit, window_seconds)
+            if result.allowed:
+                conn.execute(
+                    "INSERT INTO rate_limits (key, window, current, previous, expires_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET window = excluded.window, current = excluded.current, "
+                    "previous = excluded.previous, expires_at = excluded.expires_at",
+                    (row_key, window, current + 1, previous, (window + 2) * window_seconds),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def stats(self) -> dict:
+        return {"backend": "sqlite", "keys": self._conn().execute("SELECT count(*) FROM rate_limits").fetchone()[0]}
+
+
+class RedisRateLimitBackend:
+    """One counter per (key, fixed window), expiring after two windows."""
+    blocking = True
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the `redis` package")
+        self._client = redis.Redis.from_url(url)
+
+    def hit(self, namespace: str, key: str, limit: int, window_seconds: int, now: float | None = None) -> RateLimitResult:
+        window, elapsed = _split(time.time() if now is None else now, window_seconds)
+        prefix = f"ratelimit:{namespace}:{key}:"
+        pipe = self._client.pipeline(transaction=False)
+        pipe.incr(prefix + str(window))
+        pipe.expire(prefix + str(window), window_seconds * 2)
+        pipe.get(prefix + str(window - 1))
+        current, _, previous = pipe.execute()
+
+        result = evaluate(int(current) - 1, int(previous or 0), elapsed, limit, window_seconds)
+        if not result.allowed:   # rejected requests don't count
+            self._client.decr(prefix + str(window))
+        return result
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+RateLimitBackend = MemoryRateLimitBackend | SQLiteRateLimitBackend | RedisRateLimitBackend
+
+
+def create_rate_limit_backend() -> RateLimitBackend:
+    """Build the backend selected by `settings.RATE_LIMIT_BACKEND`."""
+    if settings.RATE_LIMIT_BACKEND == "redis" and settings.REDIS_URL:
+        return RedisRateLimitBackend(settings.REDIS_URL)
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        logger.warning("RATE_LIMIT_BACKEND=redis but REDIS_URL is not set — using in-process counters")
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimitBackend(settings.RATE_LIMIT_SQLITE_PATH)
+    return MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
@@ -1,5 +1,10 @@
 # Ajouter l'import
 from app.models.refund import Refund, RefundStatus
+from app.models.facet import ProductFacet
+from app.models.token import TokenRevocation
+from app.models.idempotency import IdempotencyKey
+from app.models.webhook import WebhookEvent, WebhookStatus
+from app.models.sales import SalesRollup
 
 # Ajouter dans __all__
 __all__ = [
@@ -8,4 +13,9 @@ __all__ = [
     "Cart", "CartItem",
     "Order", "OrderItem", "Payment", "OrderStatus", "PaymentStatus",
     "Refund", "RefundStatus",   # <-- nouveau
+    "ProductFacet",
+    "TokenRevocation",
+    "IdempotencyKey",
+    "WebhookEvent", "WebhookStatus",
+    "SalesRollup",
 ]
\ No newline at end of file
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Boolean, UniqueConstraint
+from app.core.database import Base
+
+
+class ProductFacet(Base):
+    """
+    Maintained aggregate: number of active products per
+    (category, seller, price bucket, in stock). Kept up to date incrementally
+    by FacetService; `python manage.py rebuild-facets` recomputes it.
+    """
+    __tablename__ = "product_facets"
+    __table_args__ = (
+        UniqueConstraint("category", "seller_id", "price_bucket", "in_stock", name="uq_product_facets_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    category = Column(String(100), nullable=False, default="")   # "" = uncategorised (NULLs break the unique key)
+    seller_id = Column(Integer, nullable=False, index=True)
+    price_bucket = Column(Integer, nullable=False)
+    in_stock = Column(Boolean, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from datetime import datetime, timezone
+from app.core.database import Base
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class IdempotencyKey(Base):
+    """
+    `Idempotency-Key` seen on a non-idempotent route (checkout, refund) and
+    the response it produced, replayed on retries until `expires_at`.
+    `response_status` is NULL while the first request is still running.
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "endpoint", "key", name="uq_idempotency_keys_user_endpoint_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    endpoint = Column(String(100), nullable=False)
+    key = Column(String(255), nullable=False)
+    fingerprint = Column(String(64), nullable=False)   # sha256 of the request parameters
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)        # JSON
+    created_at = Column(DateTime(timezone=True), default=_now, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
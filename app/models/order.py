@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 import enum
@@ -27,12 +27,17 @@ class PaymentStatus(str, enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Buyer order history: keyset on (created_at, id) per buyer
+        Index("ix_orders_buyer_created_id", "buyer_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     buyer_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING, nullable=False)
     total_price = Column(Float, nullable=False)
     stripe_payment_intent_id = Column(String(255), nullable=True, unique=True)
+    sweep_check_at = Column(DateTime(timezone=True), nullable=True)   # reservation sweeper: don't re-check before
     created_at = Column(DateTime(timezone=True), default=_now, nullable=False)
     updated_at = Column(DateTime(timezone=True), default=_now, onupdate=_now, nullable=False)
 
@@ -44,11 +49,16 @@ class Order(Base):
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        # Seller fulfilment feed: a seller's lines, newest orders first
+        Index("ix_order_items_seller_order", "seller_id", "order_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id", ondelete="SET NULL"), nullable=True)
     seller_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    category = Column(String(100), nullable=True)   # product category at checkout (sales rollups)
     quantity = Column(Integer, nullable=False)
     price_at_time = Column(Float, nullable=False)
     subtotal = Column(Float, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Boolean, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.core.database import Base
@@ -10,6 +10,12 @@ def _now() -> datetime:
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # Keyset pagination: (created_at, id) seek, optionally narrowed by category / seller
+        Index("ix_products_active_created_id", "is_active", "created_at", "id"),
+        Index("ix_products_category_created_id", "category", "created_at", "id"),
+        Index("ix_products_seller_created_id", "seller_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
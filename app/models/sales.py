@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, Float, String, Date, Index, UniqueConstraint
+from app.core.database import Base
+
+
+class SalesRollup(Base):
+    """
+    Maintained aggregate: units sold, gross revenue and refunded amount per
+    (day, seller, category). Sales count on the order's day, refunds on the
+    refund's day (UTC). Kept up to date incrementally by SalesService;
+    `python manage.py rebuild-rollups` recomputes it.
+    """
+    __tablename__ = "sales_rollups"
+    __table_args__ = (
+        UniqueConstraint("day", "seller_id", "category", name="uq_sales_rollups_key"),
+        # Seller analytics: one seller over a date range
+        Index("ix_sales_rollups_seller_day", "seller_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    seller_id = Column(Integer, nullable=False)                   # 0 = seller account deleted
+    category = Column(String(100), nullable=False, default="")   # snapshot at checkout; "" = uncategorised
+    units = Column(Integer, nullable=False, default=0)
+    gross = Column(Float, nullable=False, default=0.0)
+    refunds = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from datetime import datetime, timezone
+from app.core.database import Base
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class TokenRevocation(Base):
+    """
+    Persisted token blocklist, mirrored in memory by every worker
+    (see app.core.revocation).
+
+    - `jti` set  : that single token is revoked (logout, rotated refresh token).
+    - `jti` NULL : every token of `user_id` issued before `revoked_at` is revoked
+                   (refresh-token reuse detected).
+
+    Rows are useless once `expires_at` is past and get purged.
+    """
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(32), unique=True, nullable=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    reason = Column(String(20), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), default=_now, nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
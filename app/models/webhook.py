@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, Index
+from datetime import datetime, timezone
+import enum
+from app.core.database import Base
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class WebhookStatus(str, enum.Enum):
+    PENDING = "pending"          # waiting for (another) attempt at `next_attempt_at`
+    PROCESSING = "processing"    # claimed by a worker until `next_attempt_at` (lease)
+    DONE = "done"
+    DEAD = "dead"                # gave up after WEBHOOK_MAX_ATTEMPTS — needs a human
+
+
+class WebhookEvent(Base):
+    """
+    Inbox of verified Stripe events: stored on receipt (deduplicated on the
+    Stripe event id), processed asynchronously by WebhookService.
+    """
+    __tablename__ = "webhook_events"
+    __table_args__ = (
+        Index("ix_webhook_events_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String(255), unique=True, nullable=False)
+    type = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)           # raw event JSON
+    status = Column(Enum(WebhookStatus), default=WebhookStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime(timezone=True), default=_now, nullable=False)
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), default=_now, nullable=False)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
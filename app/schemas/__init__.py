@@ -1,10 +1,13 @@
 from app.schemas.user import (
     UserCreate, UserLogin, UserUpdate, PasswordChange,
-    UserResponse, TokenResponse, RefreshRequest,
+    UserResponse, TokenResponse, RefreshRequest, LogoutRequest,
+)
+from app.schemas.product import (
+    ProductCreate, ProductUpdate, ProductResponse, ProductListResponse,
+    ProductBatchRequest, ProductBatchResponse,
 )
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductListResponse
 from app.schemas.cart import CartItemAdd, CartItemUpdate, CartItemResponse, CartResponse
 from app.schemas.order import (
     OrderItemResponse, OrderResponse, PaymentResponse,
-    CheckoutResponse, OrderStatusUpdate,
+    CheckoutResponse, OrderStatusUpdate, SellerOrderItemResponse,
 )
\ No newline at end of file
@@ -28,6 +28,21 @@ class OrderResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class SellerOrderItemResponse(BaseModel):
+    id: int
+    order_id: int
+    order_status: OrderStatus
+    ordered_at: datetime
+    order_updated_at: datetime
+    product_id: Optional[int] = None
+    product_name: Optional[str] = None
+    quantity: int
+    price_at_time: float
+    subtotal: float
+
+    model_config = {"from_attributes": True}
+
+
 class PaymentResponse(BaseModel):
     id: int
     order_id: int
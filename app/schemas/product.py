@@ -50,9 +50,61 @@ class ProductResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+MAX_BATCH_IDS = 200
+
+
+class ProductBatchRequest(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+
+class ProductBatchResponse(BaseModel):
+    items: list[ProductResponse]        # in requested order, duplicates collapsed
+    missing: list[int]                  # unknown or inactive ids
+
+
 class ProductListResponse(BaseModel):
     items: list[ProductResponse]
-    total: int
+    total: Optional[int] = None         # null when total_mode=none
     page: int
     page_size: int
-    pages: int
\ No newline at end of file
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None   # set in cursor mode when more results follow
+
+
+# ── Facets ────────────────────────────────────────────────────────────────────
+class CategoryFacet(BaseModel):
+    category: Optional[str] = None      # null = uncategorised
+    count: int
+
+
+class SellerFacet(BaseModel):
+    seller_id: int
+    count: int
+
+
+class PriceBucketFacet(BaseModel):
+    min: float
+    max: Optional[float] = None         # null = open-ended
+    count: int
+
+
+class ProductFacetsResponse(BaseModel):
+    total: int
+    in_stock: int
+    categories: list[CategoryFacet]
+    sellers: list[SellerFacet]
+    price_buckets: list[PriceBucketFacet]
+
+
+# ── Bulk import ───────────────────────────────────────────────────────────────
+class BulkRowError(BaseModel):
+    row: int                            # 1-based data row (CSV header excluded) / NDJSON line
+    error: str
+
+
+class BulkImportReport(BaseModel):
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list[BulkRowError] = []
+    errors_truncated: bool = False      # more failures than reported in `errors`
@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+
+class SalesFigures(BaseModel):
+    units: int = 0
+    gross: float = 0.0
+    refunds: float = 0.0
+    net: float = 0.0
+
+
+class SalesDay(SalesFigures):
+    day: date
+
+
+class SalesCategory(SalesFigures):
+    category: Optional[str] = None
+
+
+class SalesSeller(SalesFigures):
+    seller_id: Optional[int] = None
+
+
+class SalesReport(BaseModel):
+    date_from: date
+    date_to: date
+    totals: SalesFigures
+    days: list[SalesDay]
+    categories: list[SalesCategory]
+    sellers: list[SalesSeller] = []
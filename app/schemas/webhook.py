@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from app.models.webhook import WebhookStatus
+
+
+class WebhookEventResponse(BaseModel):
+    id: int
+    event_id: str
+    type: str
+    status: WebhookStatus
+    attempts: int
+    next_attempt_at: datetime
+    last_error: Optional[str] = None
+    received_at: datetime
+    processed_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
@@ -1,8 +1,14 @@
 from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, PasswordChange
-from app.core.security import hash_password, verify_password, create_access_token, create_refresh_token, decode_token
+from app.core.permissions import invalidate_user
+from app.services.token_service import TokenService
+from app.core.security import (
+    hash_password, verify_password, verify_and_update_password,
+    create_access_token, create_refresh_token, decode_token,
+)
 
 
 class AuthService:
@@ -26,31 +32,57 @@ class AuthService:
     @staticmethod
     def signin(db: Session, email: str, password: str) -> tuple[User, str, str]:
         user = db.query(User).filter(User.email == email).first()
-        if not user or not verify_password(password, user.password):
+        valid, new_hash = verify_and_update_password(password, user.password) if user else (False, None)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
             )
         if not user.is_active:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account disabled")
+        if new_hash:   # Argon2 cost parameters changed since this hash was made
+            user.password = new_hash
+            db.commit()
         return user, create_access_token(user.id), create_refresh_token(user.id)
 
     @staticmethod
     def refresh(db: Session, refresh_token: str) -> tuple[str, str]:
+        """Rotate: the refresh token is single-use, presenting it again revokes the user's sessions."""
         payload = decode_token(refresh_token)
         if payload is None or payload.get("type") != "refresh":
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
         user = db.query(User).filter(User.id == int(payload["sub"])).first()
         if not user or not user.is_active:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        TokenService.rotate(db, payload)
         return create_access_token(user.id), create_refresh_token(user.id)
 
+    @staticmethod
+    def logout(db: Session, claims: dict, refresh_token: str | None = None) -> None:
+        """Revoke the caller's access token (`claims` from get_token_payload) and, if given, their refresh token."""
+        user_id = claims["user_id"]
+        revoke = [(claims.get("jti"), claims["exp"])]
+        if refresh_token is not None:
+            payload = decode_token(refresh_token)
+            if payload is None or payload.get("type") != "refresh" or payload.get("sub") != str(user_id):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid refresh token")
+            revoke.append((payload.get("jti"), payload["exp"]))
+
+        for jti, exp in revoke:
+            if jti is None:   # legacy token without jti: expires on its own
+                continue
+            try:
+                TokenService.revoke(db, jti, user_id, exp, reason="logout")
+            except IntegrityError:   # already revoked
+                db.rollback()
+
     @staticmethod
     def update_profile(db: Session, user: User, data: UserUpdate) -> User:
         for field, value in data.model_dump(exclude_none=True).items():
             setattr(user, field, value)
         db.commit()
         db.refresh(user)
+        invalidate_user(user.id)
         return user
 
     @staticmethod
@@ -58,4 +90,5 @@ class AuthService:
         if not verify_password(data.current_password, user.password):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Incorrect current password")
         user.password = hash_password(data.new_password)
-        db.commit()
\ No newline at end of file
+        db.commit()
+        invalidate_user(user.id)
\ No newline at end of file
@@ -2,13 +2,13 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from app.models.cart import Cart, CartItem
 from app.models.product import Product
-from app.models.user import User
+from app.core.permissions import CurrentUser
 from app.schemas.cart import CartItemAdd, CartItemUpdate
 
 
 class CartService:
     @staticmethod
-    def _get_or_create_cart(db: Session, user: User) -> Cart:
+    def _get_or_create_cart(db: Session, user: CurrentUser) -> Cart:
         cart = db.query(Cart).filter(Cart.user_id == user.id).first()
         if not cart:
             cart = Cart(user_id=user.id)
@@ -18,11 +18,11 @@ class CartService:
         return cart
 
     @staticmethod
-    def get_cart(db: Session, user: User) -> Cart:
+    def get_cart(db: Session, user: CurrentUser) -> Cart:
         return CartService._get_or_create_cart(db, user)
 
     @staticmethod
-    def add_item(db: Session, user: User, data: CartItemAdd) -> Cart:
+    def add_item(db: Session, user: CurrentUser, data: CartItemAdd) -> Cart:
         product = db.query(Product).filter(Product.id == data.product_id, Product.is_active == True).first()
         if not product:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
@@ -52,7 +52,7 @@ class CartService:
         return cart
 
     @staticmethod
-    def update_item(db: Session, user: User, item_id: int, data: CartItemUpdate) -> Cart:
+    def update_item(db: Session, user: CurrentUser, item_id: int, data: CartItemUpdate) -> Cart:
         cart = CartService._get_or_create_cart(db, user)
         item = db.query(CartItem).filter(CartItem.id == item_id, CartItem.cart_id == cart.id).first()
         if not item:
@@ -71,7 +71,7 @@ class CartService:
         return cart
 
     @staticmethod
-    def clear(db: Session, user: User) -> None:
+    def clear(db: Session, user: CurrentUser) -> None:
         cart = db.query(Cart).filter(Cart.user_id == user.id).first()
         if cart:
             db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
@@ -0,0 +1,78 @@
+"""
+Catalogue export feed (NDJSON / CSV), streamed with a server-side cursor.
+
+Rows are fetched `yield_per` at a time and written batch by batch, so
+memory stays constant whatever the catalogue size. Used by
+GET /products/export and `python manage.py export`.
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, Literal
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models.product import Product
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_FIELDS = (
+    "id", "name", "description", "price", "image_url",
+    "category", "stock", "seller_id", "created_at", "updated_at",
+)
+BATCH_SIZE = 1000
+
+
+def _jsonable(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+class ExportService:
+    @staticmethod
+    def iter_products(
+        db: Session,
+        fmt: ExportFormat = "ndjson",
+        category: str | None = None,
+        seller_id: int | None = None,
+    ) -> Iterator[bytes]:
+        """Yield the active catalogue as encoded chunks (one per fetched batch)."""
+        stmt = (
+            select(*(getattr(Product, f) for f in EXPORT_FIELDS))
+            .where(Product.is_active == True)
+            .order_by(Product.id)
+        )
+        if category:
+            stmt = stmt.where(Product.category == category)
+        if seller_id:
+            stmt = stmt.where(Product.seller_id == seller_id)
+
+        result = db.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == "csv" else None
+        if writer:
+            writer.writerow(EXPORT_FIELDS)
+
+        for rows in result.partitions():
+            for row in rows:
+                if writer:
+                    writer.writerow([_jsonable(v) for v in row])
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, map(_jsonable, row))), ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():   # CSV header of an empty export
+            yield buffer.getvalue().encode()
+
+    @staticmethod
+    def gzip_stream(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Compress a byte stream on the fly (gzip container)."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
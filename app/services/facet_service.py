@@ -0,0 +1,208 @@
+"""
+Catalogue facets (counts per category / seller / price bucket).
+
+Counts come from the `product_facets` aggregate table, which every write
+path adjusts incrementally with `FacetService.track` / `apply` (product
+create/update/delete, bulk import, checkout stock reservation, stock
+restores). Searches can't use the aggregate and are counted live.
+"""
+import bisect
+import logging
+from collections import Counter
+from sqlalchemy import Engine, case, func, select, update, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models.facet import ProductFacet
+from app.models.product import Product
+from app.schemas.product import ProductFacetsResponse, CategoryFacet, SellerFacet, PriceBucketFacet
+from app.services.search_service import SearchService
+
+logger = logging.getLogger(__name__)
+
+# Lower bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKETS = (0, 10, 25, 50, 100, 250, 500, 1000)
+
+FacetKey = tuple[str, int, int, bool]   # (category, seller_id, price_bucket, in_stock)
+
+
+def price_bucket(price: float) -> int:
+    return max(bisect.bisect_right(PRICE_BUCKETS, price) - 1, 0)
+
+
+def facet_key(category: str | None, seller_id: int, price: float, stock: int, is_active: bool) -> FacetKey | None:
+    """Aggregate row a product counts towards, or None when it is not listed."""
+    if not is_active:
+        return None
+    return category or "", seller_id, price_bucket(price), stock > 0
+
+
+def _upsert(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    stmt = dialect_insert(ProductFacet)
+    return stmt.on_conflict_do_update(
+        index_elements=["category", "seller_id", "price_bucket", "in_stock"],
+        set_={"count": ProductFacet.count + stmt.excluded.count},
+    )
+
+
+class FacetService:
+    @staticmethod
+    def key_of(product: Product) -> FacetKey | None:
+        return facet_key(product.category, product.seller_id, product.price, product.stock, product.is_active)
+
+    @staticmethod
+    def track(db: Session, before: FacetKey | None, after: FacetKey | None) -> None:
+        """Move one product from `before` to `after` (either may be None)."""
+        if before == after:
+            return
+        deltas: Counter = Counter()
+        if before is not None:
+            deltas[before] -= 1
+        if after is not None:
+            deltas[after] += 1
+        FacetService.apply(db, deltas)
+
+    @staticmethod
+    def apply(db: Session, deltas: Counter) -> None:
+        """Add `deltas` to the aggregate inside the caller's transaction (keys sorted: stable lock order)."""
+        changes = sorted((key, delta) for key, delta in deltas.items() if delta)
+        if not changes:
+            return
+        stmt = _upsert(db.get_bind().dialect.name)
+        for (category, seller_id, bucket, in_stock), delta in changes:
+            row = {"category": category, "seller_id": seller_id, "price_bucket": bucket, "in_stock": in_stock}
+            if stmt is not None:
+                db.execute(stmt, {**row, "count": delta})
+                continue
+            updated = db.execute(
+                update(ProductFacet)
+                .where(*(getattr(ProductFacet, k) == v for k, v in row.items()))
+                .values(count=ProductFacet.count + delta)
+            )
+            if updated.rowcount == 0:
+                db.execute(insert(ProductFacet).values(**row, count=delta))
+
+    # ── Maintenance ───────────────────────────────────────────────────────────
+    @staticmethod
+    def live_counts(db: Session) -> Counter:
+        """Recompute the aggregate from `products` (used by rebuild)."""
+        counts: Counter = Counter()
+        rows = db.execute(
+            select(Product.category, Product.seller_id, Product.price, Product.stock)
+            .where(Product.is_active == True)
+            .execution_options(yield_per=5000)
+        )
+        for category, seller_id, price, stock in rows:
+            counts[facet_key(category, seller_id, price, stock, True)] += 1
+        return counts
+
+    @staticmethod
+    def rebuild(db: Session) -> None:
+        """Replace the aggregate with live counts. Caller commits."""
+        db.query(ProductFacet).delete()
+        rows = [
+            {"category": c, "seller_id": s, "price_bucket": b, "in_stock": i, "count": n}
+            for (c, s, b, i), n in FacetService.live_counts(db).items()
+        ]
+        if rows:
+            db.execute(insert(ProductFacet), rows)
+
+    @staticmethod
+    def init(engine: Engine) -> None:
+        """Backfill the aggregate on first start (every worker: the loser of a race rolls back)."""
+        with Session(engine) as db:
+            empty = db.query(ProductFacet.id).first() is None
+            if empty and db.query(Product.id).filter(Product.is_active == True).first() is not None:
+                try:
+                    FacetService.rebuild(db)
+                    db.commit()
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    logger.info("product_facets backfill left to another worker: %s", e.__class__.__name__)
+
+    # ── Read ──────────────────────────────────────────────────────────────────
+    @staticmethod
+    def get_facets(
+        db: Session,
+        category: str | None = None,
+        seller_id: int | None = None,
+        search: str | None = None,
+    ) -> ProductFacetsResponse:
+        if search:
+            return FacetService._live_facets(db, category, seller_id, search)
+
+        def grouped(*columns):
+            query = db.query(*columns, func.sum(ProductFacet.count)).filter(ProductFacet.count > 0)
+            if category:
+                query = query.filter(ProductFacet.category == category)
+            if seller_id:
+                query = query.filter(ProductFacet.seller_id == seller_id)
+            return query.group_by(*columns).all()
+
+        return FacetService._response(
+            categories=grouped(ProductFacet.category),
+            sellers=grouped(ProductFacet.seller_id),
+            buckets=grouped(ProductFacet.price_bucket),
+            stock=grouped(ProductFacet.in_stock),
+        )
+
+    @staticmethod
+    def _live_facets(db: Session, category: str | None, seller_id: int | None, search: str) -> ProductFacetsResponse:
+        base = db.query(Product.id).filter(Product.is_active == True)
+        if category:
+            base = base.filter(Product.category == category)
+        if seller_id:
+            base = base.filter(Product.seller_id == seller_id)
+        matching = SearchService.apply(base, search, ranked=False).subquery()
+
+        def grouped(column):
+            return (
+                db.query(column, func.count())
+                .select_from(Product)
+                .join(matching, matching.c.id == Product.id)
+                .group_by(column)
+                .all()
+            )
+
+        bucket = case(
+            *[(Product.price >= lower, i) for i, lower in reversed(list(enumerate(PRICE_BUCKETS)))],
+            else_=0,
+        )
+        return FacetService._response(
+            categories=[(c or "", n) for c, n in grouped(Product.category)],
+            sellers=grouped(Product.seller_id),
+            buckets=grouped(bucket),
+            stock=grouped(Product.stock > 0),
+        )
+
+    @staticmethod
+    def _response(categories, sellers, buckets, stock) -> ProductFacetsResponse:
+        merged_categories: Counter = Counter()
+        for value, count in categories:
+            merged_categories[value or ""] += int(count)
+        bucket_counts = {int(b): int(n) for b, n in buckets}
+        return ProductFacetsResponse(
+            total=sum(merged_categories.values()),
+            in_stock=sum(int(n) for flag, n in stock if flag),
+            categories=[
+                CategoryFacet(category=value or None, count=count)
+                for value, count in merged_categories.most_common()
+            ],
+            sellers=sorted(
+                (SellerFacet(seller_id=s, count=int(n)) for s, n in sellers),
+                key=lambda f: -f.count,
+            ),
+            price_buckets=[
+                PriceBucketFacet(
+                    min=lower,
+                    max=PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None,
+                    count=bucket_counts.get(i, 0),
+                )
+                for i, lower in enumerate(PRICE_BUCKETS)
+            ],
+        )
@@ -0,0 +1,147 @@
+"""
+`Idempotency-Key` handling for non-idempotent routes (checkout, refunds).
+
+The first request with a key claims it (a row committed before any work),
+runs, and stores its response; retries with the same key and parameters
+get that stored response back instead of a second order / PaymentIntent /
+Stripe refund. Concurrent duplicates in one worker share a single execution
+(SingleFlight); across workers the unique key row makes the loser answer
+409 until the first request finishes.
+
+Client errors (4xx) are stored and replayed like successes. Server errors
+(5xx, e.g. Stripe unreachable), 409 and 429 release the key so the client
+can retry.
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+from fastapi import HTTPException, status
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.singleflight import SingleFlight
+from app.models.idempotency import IdempotencyKey
+
+_flight = SingleFlight("idempotency")
+
+# Client errors that a retry with the same key may legitimately turn into a success
+_RETRYABLE = {status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS}
+
+
+def fingerprint(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyService:
+    @staticmethod
+    def run(
+        db: Session,
+        key: str | None,
+        user_id: int,
+        endpoint: str,
+        request_fingerprint: str,
+        fn: Callable[[], dict],
+    ) -> tuple[dict, bool]:
+        """
+        Run `fn` (returning a JSON-able body) at most once per key.
+        Returns `(body, replayed)`; stored client errors are raised again as HTTPException.
+        """
+        if key is None:
+            return fn(), False
+        return _flight.do(
+            (user_id, endpoint, key, request_fingerprint),
+            lambda: IdempotencyService._run_once(db, key, user_id, endpoint, request_fingerprint, fn),
+        )
+
+    @staticmethod
+    def _run_once(db: Session, key: str, user_id: int, endpoint: str, request_fingerprint: str, fn) -> tuple[dict, bool]:
+        record = IdempotencyService._claim(db, key, user_id, endpoint, request_fingerprint)
+        if record is not None:
+            return IdempotencyService._replay(record, request_fingerprint), True
+
+        try:
+            body = fn()
+        except HTTPException as e:
+            db.rollback()
+            if e.status_code >= 500 or e.status_code in _RETRYABLE:
+                IdempotencyService._release(db, key, user_id, endpoint)
+            else:
+                IdempotencyService._store(db, key, user_id, endpoint, e.status_code, {"detail": e.detail})
+            raise
+        except BaseException:
+            db.rollback()
+            IdempotencyService._release(db, key, user_id, endpoint)
+            raise
+
+        IdempotencyService._store(db, key, user_id, endpoint, status.HTTP_200_OK, body)
+        return body, False
+
+    @staticmethod
+    def _claim(db: Session, key: str, user_id: int, endpoint: str, request_fingerprint: str) -> IdempotencyKey | None:
+        """Insert the key (returns None: the caller runs) or return the live record holding it."""
+        now = datetime.now(timezone.utc)
+        existing = db.query(IdempotencyKey).filter_by(user_id=user_id, endpoint=endpoint, key=key)
+        for _ in range(2):
+            db.add(IdempotencyKey(
+                user_id=user_id, endpoint=endpoint, key=key, fingerprint=request_fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            ))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                db.rollback()
+
+            record = existing.filter(IdempotencyKey.expires_at > now).first()
+            if record is not None:
+                return record
+            existing.delete(synchronize_session=False)   # expired: the key can be reused
+            db.commit()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Idempotency key is busy, retry later")
+
+    @staticmethod
+    def _replay(record: IdempotencyKey, request_fingerprint: str) -> dict:
+        if record.fingerprint != request_fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency key already used with different parameters",
+            )
+        if record.response_status is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this idempotency key is still in progress",
+            )
+        body = json.loads(record.response_body)
+        if record.response_status >= 400:
+            raise HTTPException(status_code=record.response_status, detail=body["detail"])
+        return body
+
+    @staticmethod
+    def _store(db: Session, key: str, user_id: int, endpoint: str, status_code: int, body: dict) -> None:
+        db.query(IdempotencyKey).filter_by(user_id=user_id, endpoint=endpoint, key=key).update(
+            {
+                IdempotencyKey.response_status: status_code,
+                IdempotencyKey.response_body: json.dumps(body, default=str),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+
+    @staticmethod
+    def _release(db: Session, key: str, user_id: int, endpoint: str) -> None:
+        db.query(IdempotencyKey).filter_by(user_id=user_id, endpoint=endpoint, key=key).delete(synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def purge(db: Session) -> int:
+        result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.now(timezone.utc)))
+        db.commit()
+        return result.rowcount
+
+    @staticmethod
+    def purge_job() -> None:
+        with SessionLocal() as db:
+            IdempotencyService.purge(db)
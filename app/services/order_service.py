@@ -1,11 +1,24 @@
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import Integer, case, column, select, tuple_, update, values
+from sqlalchemy.orm import Session, aliased, selectinload
 from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.http_cache import make_etag, content_etag
+from app.core.pagination import encode_cursor, decode_cursor
 from app.models.cart import Cart, CartItem
 from app.models.order import Order, OrderItem, Payment, OrderStatus, PaymentStatus
-from app.models.user import User
+from app.models.product import Product
+from app.core.permissions import CurrentUser
 from app.schemas.order import CheckoutResponse, OrderStatusUpdate
 from app.core.stripe_client import stripe  
+from app.services.product_service import ProductService
+from app.services.facet_service import FacetService, facet_key
+from app.services.sales_service import SalesService, SOLD_STATUSES
+
+logger = logging.getLogger(__name__)
 
 if settings.STRIPE_SECRET_KEY:
     stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -13,81 +26,100 @@ if settings.STRIPE_SECRET_KEY:
 
 class OrderService:
     @staticmethod
-    def checkout(db: Session, user: User) -> CheckoutResponse:
-        """Convert cart → Order + Stripe PaymentIntent."""
+    def checkout(db: Session, user: CurrentUser) -> CheckoutResponse:
+        """
+        Convert cart → Order + Stripe PaymentIntent, in three phases so that no
+        database transaction (nor row lock) stays open during the Stripe call:
+
+        1. short transaction: create the PENDING order and reserve its stock;
+        2. no transaction: create the PaymentIntent (idempotency key = order id);
+        3. short transaction: attach the PaymentIntent, record the payment, clear the cart.
+
+        If Stripe fails the order is cancelled and its stock released. Orders
+        left between phases by a crash are cancelled by `recover_checkouts`.
+        """
+        if not settings.STRIPE_SECRET_KEY:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Payment service not configured",
+            )
+
+        # ── Phase 1: order + reservation ──────────────────────────────────────
         cart = db.query(Cart).filter(Cart.user_id == user.id).first()
-        if not cart or not cart.items:
+        # One query for every line and the product columns we need (no lazy load per line)
+        lines = (
+            db.query(
+                CartItem.id, CartItem.product_id, CartItem.quantity, CartItem.price_at_time,
+                Product.seller_id, Product.category, Product.is_active,
+            )
+            .join(Product, Product.id == CartItem.product_id)
+            .filter(CartItem.cart_id == cart.id)
+            .all()
+        ) if cart else []
+        if not lines:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cart is empty")
 
-        # ── Build order ───────────────────────────────────────────────────────
         total = 0.0
         order_items: list[OrderItem] = []
-        for ci in cart.items:
-            if not ci.product or not ci.product.is_active:
+        for line in lines:
+            if not line.is_active:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Product {ci.product_id} is no longer available",
+                    detail=f"Product {line.product_id} is no longer available",
                 )
-            if ci.product.stock < ci.quantity:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Insufficient stock for {ci.product.name}",
-                )
-            subtotal = round(ci.price_at_time * ci.quantity, 2)
+            subtotal = round(line.price_at_time * line.quantity, 2)
             total += subtotal
             order_items.append(
                 OrderItem(
-                    product_id=ci.product_id,
-                    seller_id=ci.product.seller_id,
-                    quantity=ci.quantity,
-                    price_at_time=ci.price_at_time,
+                    product_id=line.product_id,
+                    seller_id=line.seller_id,
+                    category=line.category,
+                    quantity=line.quantity,
+                    price_at_time=line.price_at_time,
                     subtotal=subtotal,
                 )
             )
+        total = round(total, 2)
 
-        order = Order(buyer_id=user.id, total_price=round(total, 2), items=order_items)
+        order = Order(buyer_id=user.id, total_price=total, items=order_items)
         db.add(order)
-        db.flush()  # get order.id before Stripe call
-
-        # ── Create Stripe PaymentIntent ───────────────────────────────────────
-        if not settings.STRIPE_SECRET_KEY:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Payment service not configured",
-            )
+        db.flush()
+        order_id = order.id   # read before commit: expired attributes would reopen a transaction
+        quantities: Counter = Counter()
+        for line in lines:
+            quantities[line.product_id] += line.quantity
+        try:
+            reserved = OrderService.reserve_stock(db, quantities)
+        except HTTPException:
+            db.rollback()
+            raise
+        db.commit()
+        ProductService.invalidate(*reserved, listings=False)
 
+        # ── Phase 2: Stripe, no transaction open ──────────────────────────────
         try:
-            intent = stripe.PaymentIntent.create(
-                amount=int(total * 100),   # Stripe uses cents
-                currency="usd",
-                metadata={"order_id": order.id, "user_id": user.id},
-                automatic_payment_methods={"enabled": True},
-            )
+            intent = OrderService._create_intent(order_id, user.id, total)
         except stripe.StripeError as e:
-            db.rollback()
+            OrderService.cancel_order(db, order_id)
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
 
-        order.stripe_payment_intent_id = intent.id
-        payment = Payment(
-            order_id=order.id,
-            stripe_id=intent.id,
-            amount=total,
-            currency="usd",
-            status=PaymentStatus.PENDING,
-        )
-        db.add(payment)
-
-        # Reserve stock
-        for ci in cart.items:
-            ci.product.stock -= ci.quantity
-
-        # Clear cart
-        db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
+        # ── Phase 3: finalize ─────────────────────────────────────────────────
+        attached = db.execute(
+            update(Order)
+            .where(Order.id == order_id, Order.status == OrderStatus.PENDING, Order.stripe_payment_intent_id.is_(None))
+            .values(stripe_payment_intent_id=intent.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not attached:   # cancelled by recovery while Stripe was slow
+            db.rollback()
+            OrderService._cancel_intent(intent.id)
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Checkout expired, please retry")
+        db.add(Payment(order_id=order_id, stripe_id=intent.id, amount=total, currency="usd", status=PaymentStatus.PENDING))
+        db.query(CartItem).filter(CartItem.id.in_([line.id for line in lines])).delete(synchronize_session=False)
         db.commit()
-        db.refresh(order)
 
         return CheckoutResponse(
-            order_id=order.id,
+            order_id=order_id,
             client_secret=intent.client_secret,
             publishable_key=settings.STRIPE_PUBLISHABLE_KEY or "",
             amount=total,
@@ -95,48 +127,274 @@ class OrderService:
         )
 
     @staticmethod
-    def handle_stripe_webhook(db: Session, payload: bytes, sig_header: str) -> dict:
-        """Process Stripe webhook events."""
+    def _create_intent(order_id: int, user_id: int, total: float):
+        """
+        PaymentIntent of an order. The idempotency key makes a repeated call
+        (retry, recovery) return the same intent instead of creating another.
+        """
+        return stripe.PaymentIntent.create(
+            amount=int(round(total * 100)),   # Stripe uses cents
+            currency="usd",
+            metadata={"order_id": order_id, "user_id": user_id},
+            automatic_payment_methods={"enabled": True},
+            idempotency_key=f"order-{order_id}",
+        )
+
+    @staticmethod
+    def _cancel_intent(intent_id: str) -> None:
         try:
-            event = stripe.Webhook.construct_event(
-                payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
+            stripe.PaymentIntent.cancel(intent_id)
+        except stripe.StripeError as e:
+            logger.warning("Could not cancel PaymentIntent %s: %s", intent_id, e)
+
+    @staticmethod
+    def cancel_order(db: Session, order_id: int) -> bool:
+        """
+        PENDING → CANCELLED and give the reserved stock back, in one transaction.
+        No-op (returns False) if the order is no longer PENDING, so concurrent
+        cancellations never release stock twice.
+        """
+        cancelled = db.execute(
+            update(Order)
+            .where(Order.id == order_id, Order.status == OrderStatus.PENDING)
+            .values(status=OrderStatus.CANCELLED)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not cancelled:
+            db.rollback()
+            return False
+        db.query(Payment).filter(Payment.order_id == order_id).update(
+            {Payment.status: PaymentStatus.FAILED}, synchronize_session=False
+        )
+        restored = OrderService.release_stock(db, OrderService._order_quantities(db, order_id))
+        db.commit()
+        ProductService.invalidate(*restored, listings=False)
+        return True
+
+    @staticmethod
+    def recover_checkouts(db: Session) -> int:
+        """
+        Cancel orders stuck between checkout phases 1 and 3 (worker crashed or
+        request aborted during the Stripe call): PENDING, no PaymentIntent
+        attached, older than CHECKOUT_RECOVERY_SECONDS. A PaymentIntent may
+        exist on Stripe's side; replaying the idempotent create returns it so
+        it can be cancelled. The buyer never got its client secret.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.CHECKOUT_RECOVERY_SECONDS)
+        stuck = (
+            db.query(Order.id, Order.buyer_id, Order.total_price)
+            .filter(
+                Order.status == OrderStatus.PENDING,
+                Order.stripe_payment_intent_id.is_(None),
+                Order.created_at < cutoff,
             )
-        except (ValueError, stripe.SignatureVerificationError):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid webhook signature")
+            .limit(100)
+            .all()
+        )
+        db.rollback()   # don't hold a transaction across the Stripe calls
 
-        if event["type"] == "payment_intent.succeeded":
-            pi = event["data"]["object"]
-            order = db.query(Order).filter(Order.stripe_payment_intent_id == pi["id"]).first()
-            if order:
-                order.status = OrderStatus.PAID
-                if order.payment:
-                    order.payment.status = PaymentStatus.SUCCEEDED
-                db.commit()
+        recovered = 0
+        for order_id, buyer_id, total in stuck:
+            if settings.STRIPE_SECRET_KEY:
+                try:
+                    OrderService._cancel_intent(OrderService._create_intent(order_id, buyer_id, total).id)
+                except stripe.StripeError as e:
+                    logger.warning("Checkout recovery: order %s left for the next run: %s", order_id, e)
+                    continue
+            if OrderService.cancel_order(db, order_id):
+                recovered += 1
+        if recovered:
+            logger.info("Checkout recovery: cancelled %d stuck orders", recovered)
+        return recovered
 
-        elif event["type"] == "payment_intent.payment_failed":
-            pi = event["data"]["object"]
-            order = db.query(Order).filter(Order.stripe_payment_intent_id == pi["id"]).first()
-            if order:
-                order.status = OrderStatus.CANCELLED
-                if order.payment:
-                    order.payment.status = PaymentStatus.FAILED
+    @staticmethod
+    def recover_checkouts_job() -> None:
+        with SessionLocal() as db:
+            OrderService.recover_checkouts(db)
 
-                # ✅ Restauration du stock
-                for item in order.items:
-                    if item.product:
-                        item.product.stock += item.quantity
+    # ── Stock ─────────────────────────────────────────────────────────────────
+    @staticmethod
+    def reserve_stock(db: Session, quantities: dict[int, int]) -> list[int]:
+        """
+        Take `quantities` (product id → units) out of stock inside the caller's
+        transaction, or raise 400 if any line can't be served (caller rolls back).
 
-                db.commit()
+        One conditional `UPDATE ... WHERE stock >= q` per product: the check and
+        the decrement are a single atomic statement, so concurrent checkouts
+        can't oversell. Products are updated in id order so that two carts
+        sharing products always lock them in the same order (no deadlock).
+        """
+        return OrderService._adjust_stock(db, {pid: -q for pid, q in quantities.items()})
 
-        return {"received": True}
+    @staticmethod
+    def release_stock(db: Session, quantities: dict[int, int]) -> list[int]:
+        """
+        Put reserved units back (cancelled / failed orders), inside the caller's
+        transaction. Set-based: one UPDATE for every product of the batch
+        (`FROM (VALUES ...)` on PostgreSQL, `CASE id` elsewhere); rows are
+        locked in id order, like `reserve_stock`, so the two can't deadlock.
+        """
+        deltas = {pid: q for pid, q in quantities.items() if q}
+        if not deltas:
+            return []
+        locked = aliased(Product)
+        in_lock_order = select(locked.id).where(locked.id.in_(deltas)).order_by(locked.id).with_for_update()
+        stmt = update(Product).where(Product.id.in_(in_lock_order))
+        if db.get_bind().dialect.name == "postgresql":
+            rows = values(column("id", Integer), column("qty", Integer), name="v").data(sorted(deltas.items()))
+            stmt = stmt.where(Product.id == rows.c.id).values(stock=Product.stock + rows.c.qty)
+        else:
+            stmt = stmt.values(stock=Product.stock + case(deltas, value=Product.id, else_=0))
+        result = db.execute(
+            stmt.values(updated_at=datetime.now(timezone.utc))
+            .returning(Product.id, Product.category, Product.seller_id, Product.price, Product.stock, Product.is_active)
+            .execution_options(synchronize_session=False)
+        )
+        facets: Counter = Counter()
+        changed: list[int] = []
+        for product_id, category, seller_id, price, stock, is_active in result:
+            facets[facet_key(category, seller_id, price, stock - deltas[product_id], is_active)] -= 1
+            facets[facet_key(category, seller_id, price, stock, is_active)] += 1
+            changed.append(product_id)   # products deleted since are simply not returned
+        facets.pop(None, None)
+        FacetService.apply(db, facets)
+        return sorted(changed)
 
     @staticmethod
-    def get_user_orders(db: Session, user: User) -> list[Order]:
-        return db.query(Order).filter(Order.buyer_id == user.id).order_by(Order.created_at.desc()).all()
+    def _order_quantities(db: Session, order_id: int) -> Counter:
+        quantities: Counter = Counter()
+        for product_id, quantity in db.query(OrderItem.product_id, OrderItem.quantity).filter(
+            OrderItem.order_id == order_id, OrderItem.product_id.isnot(None)
+        ):
+            quantities[product_id] += quantity
+        return quantities
 
     @staticmethod
-    def get_order(db: Session, order_id: int, user: User) -> Order:
-        order = db.query(Order).filter(Order.id == order_id).first()
+    def _adjust_stock(db: Session, deltas: dict[int, int]) -> list[int]:
+        now = datetime.now(timezone.utc)
+        facets: Counter = Counter()
+        changed: list[int] = []
+        for product_id in sorted(deltas):
+            delta = deltas[product_id]
+            stmt = (
+                update(Product)
+                .where(Product.id == product_id)
+                .values(stock=Product.stock + delta, updated_at=now)
+                .returning(Product.category, Product.seller_id, Product.price, Product.stock, Product.is_active)
+                .execution_options(synchronize_session=False)
+            )
+            if delta < 0:
+                stmt = stmt.where(Product.stock >= -delta, Product.is_active == True)
+            row = db.execute(stmt).first()
+            if row is None:
+                if delta < 0:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Insufficient stock for product {product_id}",
+                    )
+                continue   # product deleted since: nothing to give back
+            category, seller_id, price, stock, is_active = row
+            facets[facet_key(category, seller_id, price, stock - delta, is_active)] -= 1
+            facets[facet_key(category, seller_id, price, stock, is_active)] += 1
+            changed.append(product_id)
+        facets.pop(None, None)
+        FacetService.apply(db, facets)
+        return changed
+
+    # ── Payment events (applied by WebhookService) ────────────────────────────
+    # Each transition is guarded by the current status, so re-delivered or
+    # out-of-order events can't apply twice (e.g. restore stock twice).
+    @staticmethod
+    def mark_paid(db: Session, intent_id: str) -> None:
+        """payment_intent.succeeded"""
+        order = db.query(Order.id, Order.status).filter(Order.stripe_payment_intent_id == intent_id).first()
+        if order is None or order.status not in (OrderStatus.PENDING, OrderStatus.CANCELLED):
+            return
+        if order.status == OrderStatus.CANCELLED:
+            # Paid after an earlier failed attempt / expiry gave the stock back: take it again.
+            # Raises (→ retried, then dead-lettered) if it is gone; the payment then needs a refund.
+            reserved = OrderService.reserve_stock(db, OrderService._order_quantities(db, order.id))
+        else:
+            reserved = []
+        transitioned = db.execute(
+            update(Order)
+            .where(Order.id == order.id, Order.status == order.status)
+            .values(status=OrderStatus.PAID)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not transitioned:
+            # Status changed since we read it (concurrent payment_failed / sweep): undo any
+            # re-reservation and let the inbox retry against the new status.
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Order {order.id} changed status while being marked paid",
+            )
+        SalesService.record_sale(db, order.id)
+        db.query(Payment).filter(Payment.order_id == order.id).update(
+            {Payment.status: PaymentStatus.SUCCEEDED}, synchronize_session=False
+        )
+        db.commit()
+        ProductService.invalidate(*reserved, listings=False)
+
+    @staticmethod
+    def mark_payment_failed(db: Session, intent_id: str) -> None:
+        """payment_intent.payment_failed — cancel the order and give its stock back, once."""
+        order_id = db.query(Order.id).filter(Order.stripe_payment_intent_id == intent_id).scalar()
+        if order_id is not None:
+            OrderService.cancel_order(db, order_id)
+
+    @staticmethod
+    def get_user_orders(
+        db: Session,
+        user: CurrentUser,
+        limit: int = 50,
+        cursor: str | None = None,
+        order_status: OrderStatus | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+    ) -> tuple[list[Order], str | None, str]:
+        """
+        One page of the buyer's orders, newest first: `(orders, next_cursor, etag)`.
+        Keyset on `(created_at, id)` (index ix_orders_buyer_created_id) and the items
+        of the whole page in one `selectinload` query — two queries whatever the page size.
+        """
+        query = db.query(Order).filter(Order.buyer_id == user.id)
+        if order_status is not None:
+            query = query.filter(Order.status == order_status)
+        if created_from is not None:
+            query = query.filter(Order.created_at >= created_from)
+        if created_to is not None:
+            query = query.filter(Order.created_at < created_to)
+        if cursor:
+            created_at, last_id = decode_cursor(cursor, datetime, int)
+            query = query.filter(tuple_(Order.created_at, Order.id) < (created_at, last_id))
+
+        rows = (
+            query.options(selectinload(Order.items))
+            .order_by(Order.created_at.desc(), Order.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        orders = rows[:limit]
+        next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id) if len(rows) > limit else None
+        etag = content_etag([[o.id, o.status.value, o.updated_at.isoformat()] for o in orders] + [next_cursor])
+        return orders, next_cursor, etag
+
+    @staticmethod
+    def get_order_etag(db: Session, order_id: int, user: CurrentUser) -> str:
+        """ETag of one order (access-checked) without loading the order or its items."""
+        row = db.query(Order.id, Order.buyer_id, Order.status, Order.updated_at).filter(Order.id == order_id).first()
+        if not row:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+        from app.models.user import UserRole
+        if user.role != UserRole.ADMIN and row.buyer_id != user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+        return make_etag(row.id, row.status.value, row.updated_at)
+
+    @staticmethod
+    def get_order(db: Session, order_id: int, user: CurrentUser) -> Order:
+        order = db.query(Order).options(selectinload(Order.items)).filter(Order.id == order_id).first()
         if not order:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
         # Buyers can only see their own orders; admins see all
@@ -146,11 +404,14 @@ class OrderService:
         return order
 
     @staticmethod
-    def update_order_status(db: Session, order_id: int, data: OrderStatusUpdate, admin: User) -> Order:
+    def update_order_status(db: Session, order_id: int, data: OrderStatusUpdate, admin: CurrentUser) -> Order:
         order = db.query(Order).filter(Order.id == order_id).first()
         if not order:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+        was_sold, is_sold = order.status in SOLD_STATUSES, data.status in SOLD_STATUSES
         order.status = data.status
+        if was_sold != is_sold:
+            SalesService.record_sale(db, order.id, sign=1 if is_sold else -1)
         db.commit()
         db.refresh(order)
         return order
\ No newline at end of file
@@ -1,19 +1,61 @@
+import json
 import math
+from datetime import datetime
+from typing import Literal
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session, Query
+from app.core import metrics
+from app.core.cache import TTLCache, create_cache
+from app.core.config import settings
+from app.core.http_cache import content_etag
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.singleflight import SingleFlight
 from app.models.product import Product
-from app.models.user import User
-from app.schemas.product import ProductCreate, ProductUpdate, ProductListResponse, ProductResponse
+from app.core.permissions import CurrentUser
+from app.schemas.product import (
+    ProductCreate, ProductUpdate, ProductListResponse, ProductResponse, ProductBatchResponse,
+)
+from app.services.search_service import SearchService
+from app.services.facet_service import FacetService
+
+TotalMode = Literal["exact", "estimate", "none"]
+
+# (mode, category, seller_id, search) → total
+_count_cache = TTLCache(ttl=settings.PRODUCT_COUNT_CACHE_TTL, maxsize=settings.PRODUCT_COUNT_CACHE_SIZE)
+metrics.register("cache.product_counts", _count_cache.stats)
+
+# Serialized ProductResponse / ProductListResponse payloads.
+# Listing keys embed a version number that every catalogue write bumps.
+_product_cache = create_cache("products", ttl=settings.PRODUCT_CACHE_TTL, maxsize=settings.PRODUCT_CACHE_SIZE)
+_LIST_VERSION = "list-version"
+
+# Concurrent misses on the same key share one database query
+_flight = SingleFlight("products")
+
+
+def _product_key(product_id: int) -> str:
+    return f"product:{product_id}"
+
+
+def _invalidate_counts(seller_id: int, *categories: str | None) -> None:
+    """Drop cached totals a change to a product of `seller_id` in `categories` can affect."""
+    affected = {None, *(c or None for c in categories)}
+    _count_cache.invalidate(lambda key: key[1] in affected and key[2] in (None, seller_id))
 
 
 class ProductService:
     @staticmethod
-    def create(db: Session, data: ProductCreate, seller: User) -> Product:
+    def create(db: Session, data: ProductCreate, seller: CurrentUser) -> Product:
         product = Product(**data.model_dump(), seller_id=seller.id)
         db.add(product)
+        db.flush()
+        SearchService.index_product(db, product)
+        FacetService.track(db, None, FacetService.key_of(product))
         db.commit()
         db.refresh(product)
+        _invalidate_counts(product.seller_id, product.category)
+        ProductService.invalidate(product.id)
         return product
 
     @staticmethod
@@ -23,6 +65,62 @@ class ProductService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
         return product
 
+    @staticmethod
+    def get_public(db: Session, product_id: int) -> ProductResponse:
+        """Read-through cached variant of `get_by_id`, for the public GET route."""
+        key = _product_key(product_id)
+        cached = _product_cache.get(key)
+        if cached is None:
+            cached = _flight.do(key, lambda: ProductService._load_product(db, key, product_id))
+        return ProductResponse.model_validate(cached)
+
+    @staticmethod
+    def _load_product(db: Session, key: str, product_id: int) -> dict:
+        cached = _product_cache.get(key)   # filled while we were waiting for the flight?
+        if cached is None:
+            cached = ProductResponse.model_validate(ProductService.get_by_id(db, product_id)).model_dump(mode="json")
+            _product_cache.set(key, cached)
+        return cached
+
+    @staticmethod
+    def get_many(db: Session, product_ids: list[int]) -> ProductBatchResponse:
+        """Batch lookup: cache first, then a single `IN` query for the misses."""
+        ids = list(dict.fromkeys(product_ids))
+        payloads = {
+            int(key.split(":", 1)[1]): value
+            for key, value in _product_cache.get_many([_product_key(i) for i in ids]).items()
+        }
+
+        misses = [i for i in ids if i not in payloads]
+        if misses:
+            rows = db.query(Product).filter(Product.id.in_(misses), Product.is_active == True).all()
+            for product in rows:
+                payload = ProductResponse.model_validate(product).model_dump(mode="json")
+                _product_cache.set(_product_key(product.id), payload)
+                payloads[product.id] = payload
+
+        return ProductBatchResponse(
+            items=[ProductResponse.model_validate(payloads[i]) for i in ids if i in payloads],
+            missing=[i for i in ids if i not in payloads],
+        )
+
+    @staticmethod
+    def invalidate(*product_ids: int, listings: bool = True) -> None:
+        """
+        Evict cached reads after a committed write.
+        `listings=False` keeps listing pages (e.g. stock-only changes; they expire
+        within PRODUCT_LIST_CACHE_TTL).
+        """
+        _product_cache.delete(*(_product_key(i) for i in product_ids))
+        if listings:
+            _product_cache.incr(_LIST_VERSION)
+
+    @staticmethod
+    def invalidate_catalogue() -> None:
+        """Drop every cached total and listing page (bulk writes)."""
+        _count_cache.clear()
+        _product_cache.incr(_LIST_VERSION)
+
     @staticmethod
     def list_products(
         db: Session,
@@ -31,7 +129,62 @@ class ProductService:
         category: str | None = None,
         search: str | None = None,
         seller_id: int | None = None,
+        cursor: str | None = None,
+        total_mode: TotalMode = "exact",
+    ) -> ProductListResponse:
+        """Cached listing — see `_query_products` for the parameters."""
+        body, _ = ProductService.get_listing(db, page, page_size, category, search, seller_id, cursor, total_mode)
+        return ProductListResponse.model_validate(body)
+
+    @staticmethod
+    def get_listing(
+        db: Session,
+        page: int = 1,
+        page_size: int = 20,
+        category: str | None = None,
+        search: str | None = None,
+        seller_id: int | None = None,
+        cursor: str | None = None,
+        total_mode: TotalMode = "exact",
+    ) -> tuple[dict, str]:
+        """Serialized listing page and its content ETag, both served from the cache."""
+        key = "list:" + json.dumps(
+            [_product_cache.counter(_LIST_VERSION), page, page_size, category, search, seller_id, cursor, total_mode]
+        )
+        cached = _product_cache.get(key)
+        if cached is None:
+            cached = _flight.do(key, lambda: ProductService._load_listing(
+                db, key, page, page_size, category, search, seller_id, cursor, total_mode
+            ))
+        return cached["body"], cached["etag"]
+
+    @staticmethod
+    def _load_listing(db: Session, key: str, *args) -> dict:
+        cached = _product_cache.get(key)
+        if cached is None:
+            body = ProductService._query_products(db, *args).model_dump(mode="json")
+            cached = {"body": body, "etag": content_etag(body)}
+            _product_cache.set(key, cached, ttl=settings.PRODUCT_LIST_CACHE_TTL)
+        return cached
+
+    @staticmethod
+    def _query_products(
+        db: Session,
+        page: int,
+        page_size: int,
+        category: str | None,
+        search: str | None,
+        seller_id: int | None,
+        cursor: str | None,
+        total_mode: TotalMode,
     ) -> ProductListResponse:
+        """
+        Offset mode (`cursor is None`): classic `page`/`page_size`, search results ranked by relevance.
+        Cursor mode (`cursor` given, "" for the first page): newest first, seeking on `(created_at, id)`.
+
+        `total_mode`: "exact" (cached COUNT), "estimate" (planner statistics on PostgreSQL,
+        exact elsewhere) or "none" (no count — `total`/`pages` are null).
+        """
         query = db.query(Product).filter(Product.is_active == True)
 
         if category:
@@ -39,44 +192,93 @@ class ProductService:
         if seller_id:
             query = query.filter(Product.seller_id == seller_id)
         if search:
-            query = query.filter(
-                or_(
-                    Product.name.ilike(f"%{search}%"),
-                    Product.description.ilike(f"%{search}%"),
-                )
-            )
+            query = SearchService.apply(query, search, ranked=cursor is None)
+
+        total = ProductService._total(query, total_mode, category, seller_id, search)
+        next_cursor = None
 
-        total = query.count()
-        items = query.offset((page - 1) * page_size).limit(page_size).all()
+        if cursor is not None:
+            if cursor:
+                created_at, last_id = decode_cursor(cursor, datetime, int)
+                query = query.filter(tuple_(Product.created_at, Product.id) < (created_at, last_id))
+            rows = query.order_by(Product.created_at.desc(), Product.id.desc()).limit(page_size + 1).all()
+            items = rows[:page_size]
+            if len(rows) > page_size:
+                next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+        else:
+            if not search:
+                query = query.order_by(Product.created_at.desc(), Product.id.desc())
+            items = query.offset((page - 1) * page_size).limit(page_size).all()
 
         return ProductListResponse(
             items=[ProductResponse.model_validate(p) for p in items],
             total=total,
             page=page,
             page_size=page_size,
-            pages=math.ceil(total / page_size) if total else 0,
+            pages=None if total is None else math.ceil(total / page_size),
+            next_cursor=next_cursor,
         )
 
     @staticmethod
-    def update(db: Session, product_id: int, data: ProductUpdate, seller: User) -> Product:
+    def _total(
+        query: Query,
+        total_mode: TotalMode,
+        category: str | None,
+        seller_id: int | None,
+        search: str | None,
+    ) -> int | None:
+        if total_mode == "none":
+            return None
+        if total_mode == "estimate" and query.session.get_bind().dialect.name != "postgresql":
+            total_mode = "exact"
+
+        key = (total_mode, category or None, seller_id or None, search or None)
+        total = _count_cache.get(key)
+        if total is None:
+            query = query.order_by(None)
+            total = ProductService._estimate(query) if total_mode == "estimate" else query.count()
+            _count_cache.set(key, total)
+        return total
+
+    @staticmethod
+    def _estimate(query: Query) -> int:
+        """Row estimate from the PostgreSQL planner (`EXPLAIN`), without running the query."""
+        conn = query.session.connection()
+        compiled = query.statement.compile(dialect=conn.dialect)
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @staticmethod
+    def update(db: Session, product_id: int, data: ProductUpdate, seller: CurrentUser) -> Product:
         product = db.query(Product).filter(Product.id == product_id).first()
         if not product:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
         if product.seller_id != seller.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your product")
 
+        previous_category = product.category
+        previous_facet = FacetService.key_of(product)
         for field, value in data.model_dump(exclude_none=True).items():
             setattr(product, field, value)
+        db.flush()
+        SearchService.index_product(db, product)
+        FacetService.track(db, previous_facet, FacetService.key_of(product))
         db.commit()
         db.refresh(product)
+        _invalidate_counts(product.seller_id, previous_category, product.category)
+        ProductService.invalidate(product.id)
         return product
 
     @staticmethod
-    def delete(db: Session, product_id: int, seller: User) -> None:
+    def delete(db: Session, product_id: int, seller: CurrentUser) -> None:
         product = db.query(Product).filter(Product.id == product_id).first()
         if not product:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
         if product.seller_id != seller.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not your product")
+        FacetService.track(db, FacetService.key_of(product), None)
         product.is_active = False  # soft delete
-        db.commit()
\ No newline at end of file
+        SearchService.remove_product(db, product.id)
+        db.commit()
+        _invalidate_counts(product.seller_id, product.category)
+        ProductService.invalidate(product.id)
\ No newline at end of file
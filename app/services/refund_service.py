@@ -4,14 +4,17 @@ from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.models.order import Order, OrderStatus, PaymentStatus
 from app.models.refund import Refund, RefundStatus
-from app.models.user import User
+from app.core.permissions import CurrentUser
 from app.schemas.refund import RefundCreate
+from app.services.sales_service import SalesService
 from app.core.stripe_client import stripe  
 
 
 class RefundService:
     @staticmethod
-    def create_refund(db: Session, order_id: int, data: RefundCreate, admin: User) -> Refund:
+    def create_refund(
+        db: Session, order_id: int, data: RefundCreate, admin: CurrentUser, idempotency_key: str | None = None,
+    ) -> Refund:
         order = db.query(Order).filter(Order.id == order_id).first()
         if not order:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Commande introuvable")
@@ -37,6 +40,8 @@ class RefundService:
                 payment_intent=order.stripe_payment_intent_id,
                 amount=amount_cents,
                 reason=data.reason or "requested_by_customer",
+                # Stripe de-duplicates too, in case our own record was lost
+                idempotency_key=f"refund-{order.id}-{idempotency_key}" if idempotency_key else None,
             )
         except stripe.StripeError as e:
             raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
@@ -52,6 +57,8 @@ class RefundService:
             status=RefundStatus.SUCCEEDED if stripe_refund.status == "succeeded" else RefundStatus.PENDING,
         )
         db.add(refund)
+        if refund.status != RefundStatus.FAILED:
+            SalesService.record_refund(db, order.id, refund_amount)
 
         # Mise à jour statut commande & paiement
         order.status = OrderStatus.REFUNDED
@@ -0,0 +1,170 @@
+"""
+Expiry of abandoned checkouts.
+
+Checkout takes stock as soon as the PaymentIntent exists; when the buyer
+never confirms, the order stays PENDING and the units stay reserved. The
+sweeper finds PENDING orders older than PENDING_ORDER_TTL, cancels their
+PaymentIntents, then cancels the orders and returns their stock in one
+transaction per batch (one status UPDATE, one grouped quantity query, one
+set-based stock UPDATE).
+
+The Stripe call is injectable (`cancel_intent`, returns the intent's status)
+so the sweeper can run against a stub. An intent that turns out to have
+succeeded settles its order right away (`OrderService.mark_paid`: its
+webhook may be dead or lost). Any other intent that can't be cancelled
+(processing, awaiting capture, Stripe unreachable) keeps its order, which is
+not looked at again for RESERVATION_RECHECK_SECONDS (`Order.sweep_check_at`).
+"""
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import Session
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.stripe_client import cancel_payment_intent
+from app.models.order import Order, OrderItem, Payment, OrderStatus, PaymentStatus
+from app.services.order_service import OrderService
+from app.services.product_service import ProductService
+
+logger = logging.getLogger(__name__)
+
+_totals: Counter = Counter()
+metrics.register("reservation_sweeper", lambda: dict(_totals))
+
+
+@dataclass
+class SweepReport:
+    orders_cancelled: int = 0
+    units_released: int = 0
+    products: int = 0
+    orders_settled: int = 0          # intent had succeeded: marked paid here
+    intents_kept: int = 0            # could not be cancelled (processing / awaiting capture) — re-checked later
+    errors: int = 0                  # Stripe unreachable / intent unreadable / settling raised — re-checked later
+    released: dict[int, int] = field(default_factory=dict)   # product id → units
+
+
+class ReservationService:
+    @staticmethod
+    def sweep(
+        db: Session,
+        ttl_seconds: int | None = None,
+        cancel_intent: Callable[[str], str | None] | None = None,
+    ) -> SweepReport:
+        """Cancel every PENDING order older than the TTL, batch by batch."""
+        cancel_intent = cancel_intent or cancel_payment_intent
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(seconds=ttl_seconds or settings.PENDING_ORDER_TTL)
+        report = SweepReport()
+        last_id = 0
+        while True:
+            batch = (
+                db.query(Order.id, Order.stripe_payment_intent_id)
+                .filter(
+                    Order.status == OrderStatus.PENDING,
+                    Order.stripe_payment_intent_id.isnot(None),   # no intent: see OrderService.recover_checkouts
+                    Order.created_at < cutoff,
+                    or_(Order.sweep_check_at.is_(None), Order.sweep_check_at <= now),
+                    Order.id > last_id,
+                )
+                .order_by(Order.id)
+                .limit(settings.RESERVATION_SWEEP_BATCH)
+                .all()
+            )
+            db.rollback()   # no transaction open during the Stripe calls
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            expired, recheck = [], []
+            for order_id, intent_id in batch:
+                try:
+                    intent_status = cancel_intent(intent_id)
+                    if intent_status == "succeeded":
+                        OrderService.mark_paid(db, intent_id)
+                        report.orders_settled += 1
+                        continue
+                except Exception:
+                    # One bad order must not stop the pass (every run starts again from id 0)
+                    db.rollback()
+                    logger.exception("Reservation sweep: skipping order %d (intent %s)", order_id, intent_id)
+                    intent_status = None
+                if intent_status == "canceled":
+                    expired.append(order_id)
+                    continue
+                if intent_status is None:
+                    report.errors += 1
+                else:
+                    report.intents_kept += 1
+                recheck.append(order_id)
+            if expired:
+                ReservationService._release(db, expired, report)
+            if recheck:
+                ReservationService._postpone(db, recheck)
+
+        report.products = len(report.released)
+        _totals["runs"] += 1
+        _totals["orders_cancelled"] += report.orders_cancelled
+        _totals["units_released"] += report.units_released
+        _totals["orders_settled"] += report.orders_settled
+        _totals["intents_kept"] += report.intents_kept
+        _totals["errors"] += report.errors
+        if report.orders_cancelled:
+            logger.info(
+                "Reservation sweep: %d orders cancelled, %d units back in stock over %d products",
+                report.orders_cancelled, report.units_released, report.products,
+            )
+        return report
+
+    @staticmethod
+    def _release(db: Session, order_ids: list[int], report: SweepReport) -> None:
+        # Status guard: orders paid / cancelled meanwhile are left alone and not counted
+        cancelled = list(db.scalars(
+            update(Order)
+            .where(Order.id.in_(order_ids), Order.status == OrderStatus.PENDING)
+            .values(status=OrderStatus.CANCELLED)
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
+        ))
+        if not cancelled:
+            db.rollback()
+            return
+        db.execute(
+            update(Payment)
+            .where(Payment.order_id.in_(cancelled))
+            .values(status=PaymentStatus.FAILED)
+            .execution_options(synchronize_session=False)
+        )
+        quantities = Counter(dict(
+            db.query(OrderItem.product_id, func.sum(OrderItem.quantity))
+            .filter(OrderItem.order_id.in_(cancelled), OrderItem.product_id.isnot(None))
+            .group_by(OrderItem.product_id)
+            .all()
+        ))
+        restored = OrderService.release_stock(db, quantities)
+        db.commit()
+        ProductService.invalidate(*restored, listings=False)
+
+        report.orders_cancelled += len(cancelled)
+        for product_id in restored:
+            report.released[product_id] = report.released.get(product_id, 0) + int(quantities[product_id])
+            report.units_released += int(quantities[product_id])
+
+    @staticmethod
+    def _postpone(db: Session, order_ids: list[int]) -> None:
+        """Leave these orders out of the sweep for RESERVATION_RECHECK_SECONDS."""
+        db.execute(
+            update(Order)
+            .where(Order.id.in_(order_ids), Order.status == OrderStatus.PENDING)
+            .values(sweep_check_at=datetime.now(timezone.utc) + timedelta(seconds=settings.RESERVATION_RECHECK_SECONDS))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    @staticmethod
+    def sweep_job() -> None:
+        with SessionLocal() as db:
+            ReservationService.sweep(db)
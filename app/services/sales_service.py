@@ -0,0 +1,226 @@
+"""
+Sales rollups (units / gross / refunds per day, seller and category).
+
+Reports read the `sales_rollups` aggregate only, so they cost the same
+whatever the size of the order history. The aggregate is adjusted inside the
+transaction that changes the money: `OrderService.mark_paid` (and admin status
+changes into or out of a sold status) via `record_sale`,
+`RefundService.create_refund` via `record_refund`.
+
+Sales count on the day the order was placed and refunds on the day they were
+issued (UTC), both under the category snapshotted on the order line at
+checkout (`OrderItem.category`): recategorising or deleting a product later
+doesn't move anything, and `rebuild` reproduces what the incremental path
+wrote. A refund is split over the order's lines in proportion to their
+subtotals.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import Engine, func, select, update, insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.refund import Refund, RefundStatus
+from app.models.sales import SalesRollup
+from app.schemas.sales import SalesReport, SalesFigures, SalesDay, SalesCategory, SalesSeller
+
+logger = logging.getLogger(__name__)
+
+# Orders whose lines count as sold (REFUNDED ones were paid; the refund is booked separately)
+SOLD_STATUSES = (OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.DELIVERED, OrderStatus.REFUNDED)
+
+RollupKey = tuple[date, int, str]   # (day, seller_id, category)
+MEASURES = ("units", "gross", "refunds")
+
+
+def utc_day(value: datetime) -> date:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _deltas() -> defaultdict:
+    return defaultdict(lambda: [0, 0.0, 0.0])
+
+
+def _upsert(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    stmt = dialect_insert(SalesRollup)
+    return stmt.on_conflict_do_update(
+        index_elements=["day", "seller_id", "category"],
+        set_={m: getattr(SalesRollup, m) + getattr(stmt.excluded, m) for m in MEASURES},
+    )
+
+
+def _lines(db: Session, order_ids):
+    """(order_id, created_at, seller_id, category, quantity, subtotal) of the orders' lines."""
+    return db.execute(
+        select(
+            OrderItem.order_id, Order.created_at, OrderItem.seller_id, OrderItem.category,
+            OrderItem.quantity, OrderItem.subtotal,
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(OrderItem.order_id.in_(order_ids))
+    ).all()
+
+
+def _add_refund(deltas, lines, amount: float, day: date) -> None:
+    total = sum(line.subtotal for line in lines)
+    if total <= 0:
+        return
+    for line in lines:
+        deltas[(day, line.seller_id or 0, line.category or "")][2] += amount * line.subtotal / total
+
+
+class SalesService:
+    # ── Write path ────────────────────────────────────────────────────────────
+    @staticmethod
+    def record_sale(db: Session, order_id: int, sign: int = 1) -> None:
+        """Count (sign=-1: uncount) the order's lines. Caller commits, once per real status transition."""
+        deltas = _deltas()
+        for line in _lines(db, [order_id]):
+            row = deltas[(utc_day(line.created_at), line.seller_id or 0, line.category or "")]
+            row[0] += sign * line.quantity
+            row[1] += sign * line.subtotal
+        SalesService.apply(db, deltas)
+
+    @staticmethod
+    def record_refund(db: Session, order_id: int, amount: float, day: date | None = None) -> None:
+        """Book a refund of `amount` on the order, split over its lines. Caller commits."""
+        deltas = _deltas()
+        _add_refund(deltas, _lines(db, [order_id]), amount, day or datetime.now(timezone.utc).date())
+        SalesService.apply(db, deltas)
+
+    @staticmethod
+    def apply(db: Session, deltas: dict) -> None:
+        """Add `{key: [units, gross, refunds]}` to the aggregate (keys sorted: stable lock order)."""
+        changes = sorted((key, values) for key, values in deltas.items() if any(values))
+        if not changes:
+            return
+        stmt = _upsert(db.get_bind().dialect.name)
+        for (day, seller_id, category), values in changes:
+            row = {"day": day, "seller_id": seller_id, "category": category}
+            measures = dict(zip(MEASURES, values))
+            if stmt is not None:
+                db.execute(stmt, {**row, **measures})
+                continue
+            updated = db.execute(
+                update(SalesRollup)
+                .where(*(getattr(SalesRollup, k) == v for k, v in row.items()))
+                .values({getattr(SalesRollup, m): getattr(SalesRollup, m) + v for m, v in measures.items()})
+            )
+            if updated.rowcount == 0:
+                db.execute(insert(SalesRollup).values(**row, **measures))
+
+    # ── Maintenance ───────────────────────────────────────────────────────────
+    @staticmethod
+    def live_rollups(db: Session) -> dict:
+        """Recompute the aggregate from orders and refunds (used by rebuild)."""
+        deltas = _deltas()
+        rows = db.execute(
+            select(
+                Order.created_at, OrderItem.seller_id, OrderItem.category,
+                OrderItem.quantity, OrderItem.subtotal,
+            )
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.status.in_(SOLD_STATUSES))
+            .execution_options(yield_per=5000)
+        )
+        for created_at, seller_id, category, quantity, subtotal in rows:
+            row = deltas[(utc_day(created_at), seller_id or 0, category or "")]
+            row[0] += quantity
+            row[1] += subtotal
+
+        refunds = db.execute(
+            select(Refund.order_id, Refund.amount, Refund.created_at)
+            .where(Refund.status != RefundStatus.FAILED)
+            .order_by(Refund.order_id)
+        ).all()
+        for start in range(0, len(refunds), 1000):
+            batch = refunds[start:start + 1000]
+            lines = defaultdict(list)
+            for line in _lines(db, {r.order_id for r in batch}):
+                lines[line.order_id].append(line)
+            for refund in batch:
+                _add_refund(deltas, lines[refund.order_id], refund.amount, utc_day(refund.created_at))
+        return deltas
+
+    @staticmethod
+    def rebuild(db: Session) -> None:
+        """Replace the aggregate with live figures. Caller commits."""
+        db.query(SalesRollup).delete()
+        rows = [
+            {"day": d, "seller_id": s, "category": c, **dict(zip(MEASURES, values))}
+            for (d, s, c), values in SalesService.live_rollups(db).items()
+        ]
+        if rows:
+            db.execute(insert(SalesRollup), rows)
+
+    @staticmethod
+    def init(engine: Engine) -> None:
+        """
+        Backfill the aggregate on first start. Every worker runs this: when two
+        find the table empty, the one that loses the race rolls back and keeps
+        the other's identical result.
+        """
+        with Session(engine) as db:
+            empty = db.query(SalesRollup.id).first() is None
+            if empty and db.query(Order.id).filter(Order.status.in_(SOLD_STATUSES)).first() is not None:
+                try:
+                    SalesService.rebuild(db)
+                    db.commit()
+                except SQLAlchemyError as e:
+                    db.rollback()
+                    logger.info("sales_rollups backfill left to another worker: %s", e.__class__.__name__)
+
+    # ── Read ──────────────────────────────────────────────────────────────────
+    @staticmethod
+    def report(
+        db: Session,
+        date_from: date | None = None,
+        date_to: date | None = None,
+        seller_id: int | None = None,
+        category: str | None = None,
+    ) -> SalesReport:
+        """Figures between `date_from` and `date_to` (inclusive, default: the last 30 days)."""
+        date_to = date_to or datetime.now(timezone.utc).date()
+        date_from = date_from or date_to - timedelta(days=29)
+
+        def grouped(*columns):
+            query = db.query(
+                *columns,
+                func.sum(SalesRollup.units), func.sum(SalesRollup.gross), func.sum(SalesRollup.refunds),
+            ).filter(SalesRollup.day >= date_from, SalesRollup.day <= date_to)
+            if seller_id is not None:
+                query = query.filter(SalesRollup.seller_id == seller_id)
+            if category is not None:
+                query = query.filter(SalesRollup.category == category)
+            return query.group_by(*columns).all() if columns else query.all()
+
+        def figures(units, gross, refunds) -> dict:
+            gross, refunds = round(gross or 0.0, 2), round(refunds or 0.0, 2)
+            return {"units": int(units or 0), "gross": gross, "refunds": refunds, "net": round(gross - refunds, 2)}
+
+        return SalesReport(
+            date_from=date_from,
+            date_to=date_to,
+            totals=SalesFigures(**figures(*grouped()[0])),
+            days=sorted(
+                (SalesDay(day=d, **figures(*v)) for d, *v in grouped(SalesRollup.day)),
+                key=lambda f: f.day,
+            ),
+            categories=sorted(
+                (SalesCategory(category=c or None, **figures(*v)) for c, *v in grouped(SalesRollup.category)),
+                key=lambda f: -f.gross,
+            ),
+            sellers=[] if seller_id is not None else sorted(
+                (SalesSeller(seller_id=s or None, **figures(*v)) for s, *v in grouped(SalesRollup.seller_id)),
+                key=lambda f: -f.gross,
+            ),
+        )
@@ -0,0 +1,191 @@
+"""
+Full-text product search.
+
+PostgreSQL : shadow table `product_search` (tsvector + GIN index), French
+             stemming, accents folded with `unaccent`, ranked with `ts_rank`.
+SQLite     : FTS5 virtual table `products_fts` (unicode61, remove_diacritics),
+             ranked with `bm25`.
+Other DBs  : falls back to the historical `ILIKE '%term%'` scan.
+
+Every search term is matched as a prefix ("chauss" → "chaussure").
+The index is kept in sync by ProductService (create / update / delete).
+"""
+import logging
+import re
+from sqlalchemy import Engine, bindparam, func, literal_column, or_, table, column, text
+from sqlalchemy.orm import Session, Query
+from app.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# ── Shadow structures ─────────────────────────────────────────────────────────
+_pg_search = table("product_search", column("product_id"), column("document"))
+_fts = table("products_fts", column("rowid"))
+
+_PG_DOCUMENT = (
+    "setweight(to_tsvector('french', unaccent(coalesce(p.name, ''))), 'A') || "
+    "setweight(to_tsvector('french', unaccent(coalesce(p.description, ''))), 'B')"
+)
+
+_PG_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE TABLE IF NOT EXISTS product_search ("
+    " product_id INTEGER PRIMARY KEY REFERENCES products(id) ON DELETE CASCADE,"
+    " document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_product_search_document ON product_search USING GIN (document)",
+)
+
+_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    " name, description, tokenize = 'unicode61 remove_diacritics 2')",
+)
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _tokens(search: str) -> list[str]:
+    return _TOKEN_RE.findall(search.lower())
+
+
+class SearchService:
+    @staticmethod
+    def init(engine: Engine) -> None:
+        """Create the shadow index if missing and backfill it on first run."""
+        ddl = {"postgresql": _PG_DDL, "sqlite": _SQLITE_DDL}.get(engine.dialect.name)
+        if ddl is None:
+            logger.warning("Full-text search not supported on %s — using ILIKE", engine.dialect.name)
+            return
+
+        with Session(engine) as db:
+            for statement in ddl:
+                db.execute(text(statement))
+            index_table = "product_search" if engine.dialect.name == "postgresql" else "products_fts"
+            indexed = db.execute(text(f"SELECT 1 FROM {index_table} LIMIT 1")).first()
+            if indexed is None:
+                SearchService.rebuild(db)
+            db.commit()
+
+    @staticmethod
+    def rebuild(db: Session) -> None:
+        """Re-index every active product (set-based). Caller commits."""
+        dialect = _dialect(db)
+        if dialect == "postgresql":
+            db.execute(text("DELETE FROM product_search"))
+            db.execute(text(
+                f"INSERT INTO product_search (product_id, document) "
+                f"SELECT p.id, {_PG_DOCUMENT} FROM products p WHERE p.is_active"
+            ))
+        elif dialect == "sqlite":
+            db.execute(text("DELETE FROM products_fts"))
+            db.execute(text(
+                "INSERT INTO products_fts (rowid, name, description) "
+                "SELECT id, name, coalesce(description, '') FROM products WHERE is_active = 1"
+            ))
+
+    # ── Sync hooks (called inside the caller's transaction) ───────────────────
+    @staticmethod
+    def index_product(db: Session, product: Product) -> None:
+        if not product.is_active:
+            SearchService.remove_product(db, product.id)
+            return
+
+        dialect = _dialect(db)
+        if dialect == "postgresql":
+            db.execute(
+                text(
+                    f"INSERT INTO product_search (product_id, document) "
+                    f"SELECT p.id, {_PG_DOCUMENT} FROM products p WHERE p.id = :id "
+                    f"ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document"
+                ),
+                {"id": product.id},
+            )
+        elif dialect == "sqlite":
+            db.execute(text("DELETE FROM products_fts WHERE rowid = :id"), {"id": product.id})
+            db.execute(
+                text("INSERT INTO products_fts (rowid, name, description) VALUES (:id, :name, :description)"),
+                {"id": product.id, "name": product.name, "description": product.description or ""},
+            )
+
+    @staticmethod
+    def reindex(db: Session, product_ids: list[int]) -> None:
+        """Set-based `index_product` for many rows (bulk import)."""
+        if not product_ids:
+            return
+        dialect = _dialect(db)
+        ids = {"ids": list(product_ids)}
+        if dialect == "postgresql":
+            db.execute(
+                text("DELETE FROM product_search WHERE product_id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                ids,
+            )
+            db.execute(
+                text(
+                    f"INSERT INTO product_search (product_id, document) "
+                    f"SELECT p.id, {_PG_DOCUMENT} FROM products p WHERE p.is_active AND p.id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)),
+                ids,
+            )
+        elif dialect == "sqlite":
+            db.execute(
+                text("DELETE FROM products_fts WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+                ids,
+            )
+            db.execute(
+                text(
+                    "INSERT INTO products_fts (rowid, name, description) "
+                    "SELECT id, name, coalesce(description, '') FROM products WHERE is_active = 1 AND id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)),
+                ids,
+            )
+
+    @staticmethod
+    def remove_product(db: Session, product_id: int) -> None:
+        dialect = _dialect(db)
+        if dialect == "postgresql":
+            db.execute(text("DELETE FROM product_search WHERE product_id = :id"), {"id": product_id})
+        elif dialect == "sqlite":
+            db.execute(text("DELETE FROM products_fts WHERE rowid = :id"), {"id": product_id})
+
+    # ── Query ─────────────────────────────────────────────────────────────────
+    @staticmethod
+    def apply(query: Query, search: str, ranked: bool = True) -> Query:
+        """
+        Restrict `query` (over Product) to rows matching `search`.
+        When `ranked`, results are ordered by relevance (best first).
+        """
+        tokens = _tokens(search)
+        if not tokens:
+            return query
+
+        dialect = _dialect(query.session)
+        if dialect == "postgresql":
+            tsquery = func.to_tsquery(
+                literal_column("'french'::regconfig"),
+                func.unaccent(" & ".join(f"{t}:*" for t in tokens)),
+            )
+            query = query.join(_pg_search, _pg_search.c.product_id == Product.id).filter(
+                _pg_search.c.document.op("@@")(tsquery)
+            )
+            if ranked:
+                query = query.order_by(func.ts_rank(_pg_search.c.document, tsquery).desc(), Product.id.desc())
+            return query
+
+        if dialect == "sqlite":
+            match = " ".join(f'"{t}"*' for t in tokens)
+            query = query.join(_fts, _fts.c.rowid == Product.id).filter(
+                literal_column("products_fts").op("MATCH")(match)
+            )
+            if ranked:
+                query = query.order_by(func.bm25(literal_column("products_fts")), Product.id.desc())
+            return query
+
+        return query.filter(
+            or_(
+                Product.name.ilike(f"%{search}%"),
+                Product.description.ilike(f"%{search}%"),
+            )
+        )
@@ -0,0 +1,91 @@
+"""
+Seller-side views of orders.
+
+The fulfilment feed reads `order_items` through the (seller_id, order_id)
+index, joined to `orders` (and `products` for the name) for a handful of
+columns only — no ORM entities, no lazy loads.
+"""
+import json
+from datetime import datetime
+from typing import Iterator
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.orm import Session
+from app.core.pagination import encode_cursor, decode_cursor
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+from app.schemas.order import SellerOrderItemResponse
+
+BATCH_SIZE = 1000
+
+
+def _order_items(
+    seller_id: int,
+    order_status: OrderStatus | None,
+    created_from: datetime | None,
+    created_to: datetime | None,
+    updated_since: datetime | None,
+) -> Select:
+    stmt = (
+        select(
+            OrderItem.id, OrderItem.order_id, OrderItem.product_id, OrderItem.quantity,
+            OrderItem.price_at_time, OrderItem.subtotal,
+            Order.status.label("order_status"),
+            Order.created_at.label("ordered_at"),
+            Order.updated_at.label("order_updated_at"),
+            Product.name.label("product_name"),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(OrderItem.seller_id == seller_id)
+    )
+    if order_status is not None:
+        stmt = stmt.where(Order.status == order_status)
+    if created_from is not None:
+        stmt = stmt.where(Order.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(Order.created_at < created_to)
+    if updated_since is not None:
+        stmt = stmt.where(Order.updated_at >= updated_since)
+    return stmt.order_by(OrderItem.order_id.desc(), OrderItem.id.desc())
+
+
+class SellerService:
+    @staticmethod
+    def list_order_items(
+        db: Session,
+        seller_id: int,
+        limit: int = 100,
+        cursor: str | None = None,
+        order_status: OrderStatus | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        updated_since: datetime | None = None,
+    ) -> tuple[list[SellerOrderItemResponse], str | None]:
+        """One page of the seller's order lines, newest orders first, keyset on `(order_id, id)`."""
+        stmt = _order_items(seller_id, order_status, created_from, created_to, updated_since)
+        if cursor:
+            last_order_id, last_id = decode_cursor(cursor, int, int)
+            stmt = stmt.where(tuple_(OrderItem.order_id, OrderItem.id) < (last_order_id, last_id))
+
+        rows = db.execute(stmt.limit(limit + 1)).all()
+        items = [SellerOrderItemResponse.model_validate(r) for r in rows[:limit]]
+        next_cursor = encode_cursor(items[-1].order_id, items[-1].id) if len(rows) > limit else None
+        return items, next_cursor
+
+    @staticmethod
+    def iter_order_items_ndjson(
+        db: Session,
+        seller_id: int,
+        order_status: OrderStatus | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        updated_since: datetime | None = None,
+    ) -> Iterator[bytes]:
+        """Every matching line as NDJSON, fetched and encoded BATCH_SIZE rows at a time."""
+        stmt = _order_items(seller_id, order_status, created_from, created_to, updated_since)
+        result = db.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+        for batch in result.partitions():
+            yield "".join(
+                json.dumps(SellerOrderItemResponse.model_validate(r).model_dump(mode="json")) + "\n"
+                for r in batch
+            ).encode()
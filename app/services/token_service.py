@@ -0,0 +1,100 @@
+"""
+Server-side token revocation: logout, refresh-token rotation with reuse
+detection, and the periodic sync of the in-process blocklist.
+"""
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.revocation import blocklist, timestamp
+from app.models.token import TokenRevocation
+
+# Re-read rows this far behind the last sync: transactions that committed
+# late with an older `revoked_at` are still picked up (re-applying is a no-op)
+_SYNC_OVERLAP = timedelta(seconds=60)
+_sync_state: dict = {"since": None}
+
+
+class TokenService:
+    @staticmethod
+    def revoke(db: Session, jti: str, user_id: int, exp: float, reason: str) -> None:
+        """
+        Revoke one token (valid until the `exp` timestamp) and commit.
+        Raises IntegrityError if that token was already revoked.
+        """
+        db.add(TokenRevocation(
+            jti=jti,
+            user_id=user_id,
+            reason=reason,
+            expires_at=datetime.fromtimestamp(exp, timezone.utc),
+        ))
+        db.commit()
+        blocklist.revoke(jti, exp)
+
+    @staticmethod
+    def revoke_user(db: Session, user_id: int, reason: str) -> None:
+        """Revoke every token issued to `user_id` so far, and commit."""
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        db.add(TokenRevocation(user_id=user_id, reason=reason, revoked_at=now, expires_at=expires_at))
+        db.commit()
+        blocklist.revoke_user(user_id, now.timestamp(), expires_at.timestamp())
+
+    @staticmethod
+    def rotate(db: Session, payload: dict) -> None:
+        """
+        Consume a refresh token. A token presented twice means it leaked:
+        the whole token family of the user is revoked.
+        """
+        if "jti" not in payload:   # issued before rotation existed; expires on its own
+            return
+        user_id = int(payload["sub"])
+        reused = blocklist.is_revoked({"user_id": user_id, "jti": payload["jti"], "iat": payload.get("iat", 0)})
+        if not reused:
+            try:
+                TokenService.revoke(db, payload["jti"], user_id, payload["exp"], reason="rotated")
+            except IntegrityError:   # consumed on another worker, not synced here yet
+                db.rollback()
+                reused = True
+        if reused:
+            TokenService.revoke_user(db, user_id, reason="reuse")
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token reuse detected")
+
+    # ── Background sync ───────────────────────────────────────────────────────
+    @staticmethod
+    def sync(db: Session) -> int:
+        """Load revocations recorded since the last sync (by any worker) into the blocklist."""
+        now = datetime.now(timezone.utc)
+        query = select(TokenRevocation).where(TokenRevocation.expires_at > now)
+        if _sync_state["since"] is not None:
+            query = query.where(TokenRevocation.revoked_at >= _sync_state["since"] - _SYNC_OVERLAP)
+
+        rows = db.scalars(query).all()
+        for row in rows:
+            if row.jti is not None:
+                blocklist.revoke(row.jti, timestamp(row.expires_at))
+            else:
+                blocklist.revoke_user(row.user_id, timestamp(row.revoked_at), timestamp(row.expires_at))
+        blocklist.prune(now.timestamp())
+        _sync_state["since"] = now
+        return len(rows)
+
+    @staticmethod
+    def purge(db: Session) -> int:
+        """Delete revocations whose tokens have all expired."""
+        result = db.execute(delete(TokenRevocation).where(TokenRevocation.expires_at <= datetime.now(timezone.utc)))
+        db.commit()
+        return result.rowcount
+
+    @staticmethod
+    def sync_job() -> None:
+        with SessionLocal() as db:
+            TokenService.sync(db)
+
+    @staticmethod
+    def purge_job() -> None:
+        with SessionLocal() as db:
+            TokenService.purge(db)
@@ -0,0 +1,185 @@
+"""
+Stripe webhook inbox.
+
+`receive` only verifies the signature and stores the event (deduplicated on
+the Stripe event id), so Stripe gets its 2xx in a few milliseconds whatever
+the state of the rest of the database. `drain` runs in the background: it
+claims due events in batches, applies them on a small thread pool (one
+PaymentIntent's events in order on a single thread), and
+retries failures with exponential backoff until WEBHOOK_MAX_ATTEMPTS, after
+which the event is parked as DEAD for a human to look at.
+
+Claiming is a conditional UPDATE (status + lease), so several workers can
+drain the same inbox; an event whose worker died is picked up again once
+its lease (`next_attempt_at`) expires. Handlers are idempotent and
+status-guarded (see OrderService.mark_paid / mark_payment_failed).
+"""
+import json
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+from fastapi import HTTPException, status
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.stripe_client import stripe
+from app.models.webhook import WebhookEvent, WebhookStatus
+from app.services.order_service import OrderService
+
+logger = logging.getLogger(__name__)
+
+# Stripe event type → handler(db, event data object)
+_HANDLERS: dict[str, Callable[[Session, dict], None]] = {
+    "payment_intent.succeeded": lambda db, pi: OrderService.mark_paid(db, pi["id"]),
+    "payment_intent.payment_failed": lambda db, pi: OrderService.mark_payment_failed(db, pi["id"]),
+}
+
+_LEASE = timedelta(minutes=5)
+_MAX_BACKOFF = 3600
+_stats: Counter = Counter()
+_pool = ThreadPoolExecutor(max_workers=settings.WEBHOOK_WORKERS, thread_name_prefix="webhooks")
+
+metrics.register("webhooks", lambda: dict(_stats))
+
+
+def _stream_key(payload: str, event_id: int) -> str:
+    """Object the event is about (the PaymentIntent id); events without one get a stream of their own."""
+    try:
+        return json.loads(payload)["data"]["object"]["id"]
+    except (ValueError, KeyError, TypeError):
+        return f"event-{event_id}"
+
+
+class WebhookService:
+    @staticmethod
+    def receive(db: Session, payload: bytes, sig_header: str) -> dict:
+        """Verify and store a Stripe event; duplicates are acknowledged and dropped."""
+        try:
+            event = stripe.Webhook.construct_event(payload, sig_header, settings.STRIPE_WEBHOOK_SECRET)
+        except (ValueError, stripe.SignatureVerificationError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid webhook signature")
+
+        if event["type"] not in _HANDLERS:
+            return {"received": True}
+        db.add(WebhookEvent(event_id=event["id"], type=event["type"], payload=payload.decode()))
+        try:
+            db.commit()
+            _stats["received"] += 1
+        except IntegrityError:
+            db.rollback()
+            _stats["duplicates"] += 1
+        return {"received": True}
+
+    # ── Processing ────────────────────────────────────────────────────────────
+    @staticmethod
+    def drain(db: Session) -> int:
+        """Claim and process one batch of due events. Returns the number claimed."""
+        now = datetime.now(timezone.utc)
+        due = (
+            db.query(WebhookEvent.id, WebhookEvent.payload)
+            .filter(
+                or_(WebhookEvent.status == WebhookStatus.PENDING, WebhookEvent.status == WebhookStatus.PROCESSING),
+                WebhookEvent.next_attempt_at <= now,
+            )
+            .order_by(WebhookEvent.id)
+            .limit(settings.WEBHOOK_BATCH_SIZE)
+            .all()
+        )
+        claimed = []
+        streams: dict[str, list[int]] = {}
+        for event_id, payload in due:
+            taken = db.execute(
+                update(WebhookEvent)
+                .where(
+                    WebhookEvent.id == event_id,
+                    WebhookEvent.status.in_([WebhookStatus.PENDING, WebhookStatus.PROCESSING]),
+                    WebhookEvent.next_attempt_at <= now,
+                )
+                .values(status=WebhookStatus.PROCESSING, next_attempt_at=now + _LEASE)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if taken:
+                claimed.append(event_id)
+                streams.setdefault(_stream_key(payload, event_id), []).append(event_id)
+        db.commit()
+
+        # Events of one PaymentIntent race each other (succeeded vs payment_failed on the
+        # same order): each intent's events run in id order on one thread, intents in parallel.
+        list(_pool.map(WebhookService._process_stream, streams.values()))
+        return len(claimed)
+
+    @staticmethod
+    def _process_stream(event_ids: list[int]) -> None:
+        for event_id in event_ids:
+            WebhookService._process(event_id)
+
+    @staticmethod
+    def _process(event_id: int) -> None:
+        with SessionLocal() as db:
+            event = db.get(WebhookEvent, event_id)
+            try:
+                _HANDLERS[event.type](db, json.loads(event.payload)["data"]["object"])
+            except Exception as e:
+                db.rollback()
+                WebhookService._fail(db, event_id, e)
+                return
+            event = db.get(WebhookEvent, event_id)
+            event.status = WebhookStatus.DONE
+            event.attempts += 1
+            event.last_error = None
+            event.processed_at = datetime.now(timezone.utc)
+            db.commit()
+            _stats["processed"] += 1
+
+    @staticmethod
+    def _fail(db: Session, event_id: int, error: Exception) -> None:
+        event = db.get(WebhookEvent, event_id)
+        event.attempts += 1
+        event.last_error = f"{error.__class__.__name__}: {getattr(error, 'detail', error)}"
+        if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            event.status = WebhookStatus.DEAD
+            _stats["dead"] += 1
+            logger.error("Webhook event %s dead after %d attempts: %s", event.event_id, event.attempts, event.last_error)
+        else:
+            event.status = WebhookStatus.PENDING
+            event.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=min(2 ** event.attempts, _MAX_BACKOFF))
+            _stats["retried"] += 1
+            logger.warning("Webhook event %s failed (attempt %d): %s", event.event_id, event.attempts, event.last_error)
+        db.commit()
+
+    @staticmethod
+    def list_events(db: Session, event_status: WebhookStatus, limit: int) -> list[WebhookEvent]:
+        return (
+            db.query(WebhookEvent)
+            .filter(WebhookEvent.status == event_status)
+            .order_by(WebhookEvent.id.desc())
+            .limit(limit)
+            .all()
+        )
+
+    @staticmethod
+    def retry(db: Session, event_id: int) -> WebhookEvent:
+        """Put a DEAD event back in the queue (after fixing what made it fail)."""
+        event = db.get(WebhookEvent, event_id)
+        if not event:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook event not found")
+        if event.status != WebhookStatus.DEAD:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Only dead events can be retried")
+        event.status = WebhookStatus.PENDING
+        event.attempts = 0
+        event.next_attempt_at = datetime.now(timezone.utc)
+        db.commit()
+        db.refresh(event)
+        return event
+
+    @staticmethod
+    def drain_job() -> None:
+        """Background task: drain until the inbox has nothing due."""
+        with SessionLocal() as db:
+            while WebhookService.drain(db) == settings.WEBHOOK_BATCH_SIZE:
+                pass
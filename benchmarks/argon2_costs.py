@@ -0,0 +1,60 @@
+"""
+Argon2 login throughput per hashing worker for a grid of cost parameters.
+
+    python benchmarks/argon2_costs.py [--seconds 3]
+
+Each login = one `verify` of a stored hash (what /auth/signin does).
+Calls are made one at a time, so the figure is logins/sec for one hashing
+worker. That is not one core: with parallelism > 1 argon2 fans each hash out
+over that many threads, so a worker can keep several cores busy and the pool's
+ceiling is roughly min(PASSWORD_HASH_WORKERS, cores / parallelism) times it.
+The `cpu ms/login` column (process CPU time per login) shows the real core
+cost. Pick ARGON2_TIME_COST / ARGON2_MEMORY_COST / ARGON2_PARALLELISM from
+the table.
+"""
+import argparse
+import time
+from passlib.context import CryptContext
+
+# (time_cost, memory_cost KiB, parallelism)
+COSTS = [
+    (1, 19456, 1),      # OWASP minimum
+    (2, 19456, 1),
+    (2, 65536, 1),
+    (3, 65536, 4),      # argon2-cffi default / app default
+    (4, 262144, 4),
+]
+
+
+def bench(time_cost: int, memory_cost: int, parallelism: int, seconds: float) -> tuple[float, float, float]:
+    ctx = CryptContext(
+        schemes=["argon2"],
+        argon2__time_cost=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+    hashed = ctx.hash("Secure123")
+    ctx.verify("Secure123", hashed)   # warm-up
+
+    done = 0
+    start, cpu_start = time.perf_counter(), time.process_time()
+    while time.perf_counter() - start < seconds:
+        ctx.verify("Secure123", hashed)
+        done += 1
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    return done / elapsed, elapsed / done * 1000, cpu / done * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0, help="measurement time per setting")
+    args = parser.parse_args()
+
+    print(f"{'time_cost':>9} {'memory_kib':>10} {'parallel':>8} {'logins/s/worker':>16} {'ms/login':>9} {'cpu ms/login':>13}")
+    for time_cost, memory_cost, parallelism in COSTS:
+        rate, latency, cpu = bench(time_cost, memory_cost, parallelism, args.seconds)
+        print(f"{time_cost:>9} {memory_cost:>10} {parallelism:>8} {rate:>16.1f} {latency:>9.1f} {cpu:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Requests/sec through the full middleware stack, before/after the move to
+pure ASGI middleware.
+
+    python benchmarks/middleware_overhead.py [--seconds 5] [--concurrency 32]
+
+Drives `main.app` in-process (raw ASGI calls, no sockets, so the figures
+are framework overhead only) on `/health` and `GET /api/v1/products`, once
+with the rate limiter wrapped in BaseHTTPMiddleware (the previous
+implementation) and once with the ASGI RateLimitMiddleware. Uses a
+throw-away SQLite database seeded with a few hundred products.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/middleware_benchmark.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("RATE_LIMIT_DEFAULT", str(10**9))   # measure the limiter, never trip it
+
+from fastapi import Request  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.middleware.rate_limit import RateLimitMiddleware, RateLimitResult, _client_key, _user_id  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from main import app  # noqa: E402
+
+
+class BaseHTTPRateLimitMiddleware(BaseHTTPMiddleware):
+    """Same rules and backend as RateLimitMiddleware, the BaseHTTPMiddleware way."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.limiter = RateLimitMiddleware(app)
+
+    async def dispatch(self, request: Request, call_next):
+        tightest: RateLimitResult | None = None
+        user_id = await _user_id(request.scope)
+        for rule in self.limiter.rules:
+            if rule.matches(request.method, request.url.path):
+                result = await self.limiter._hit(rule, _client_key(rule, request.scope, user_id))
+                if result is not None and (tightest is None or result.remaining < tightest.remaining):
+                    tightest = result
+        response = await call_next(request)
+        if tightest is not None:
+            response.headers.update(tightest.headers())
+        return response
+
+
+def use_rate_limiter(cls) -> None:
+    for i, middleware in enumerate(app.user_middleware):
+        if middleware.cls in (RateLimitMiddleware, BaseHTTPRateLimitMiddleware):
+            app.user_middleware[i] = type(middleware)(cls)
+    app.middleware_stack = None   # rebuilt on the next call
+
+
+def seed() -> None:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if db.query(Product.id).first() is not None:
+            return
+        seller = User(email="bench@example.com", password="x", first_name="Bench", last_name="Seller", role=UserRole.SELLER)
+        db.add(seller)
+        db.flush()
+        db.add_all(
+            Product(name=f"Product {i}", price=10 + i % 90, stock=i % 7, category=f"cat-{i % 8}", seller_id=seller.id)
+            for i in range(300)
+        )
+        db.commit()
+
+
+async def call(path: str) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(path: str, seconds: float, concurrency: int) -> float:
+    assert await call(path) == 200, f"{path} did not answer 200"
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await call(path)
+            done += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="measurement time per case")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    seed()
+    print(f"{'path':<24} {'BaseHTTPMiddleware':>19} {'pure ASGI':>10} {'gain':>7}")
+    for path in ("/health", f"{settings.API_V1_STR}/products"):
+        rates = []
+        for cls in (BaseHTTPRateLimitMiddleware, RateLimitMiddleware):
+            use_rate_limiter(cls)
+            rates.append(await measure(path, args.seconds, args.concurrency))
+        print(f"{path:<24} {rates[0]:>15.0f} r/s {rates[1]:>6.0f} r/s {rates[1] / rates[0] - 1:>+6.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
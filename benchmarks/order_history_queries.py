@@ -0,0 +1,100 @@
+"""
+Query count of one page of the buyer order history.
+
+    python benchmarks/order_history_queries.py [--orders 120] [--items 3] [--limit 50]
+
+Seeds a buyer with `--orders` orders of `--items` lines each, then walks
+the history `--limit` orders at a time exactly like GET /orders
+(OrderService.get_user_orders + OrderResponse serialisation), counting the
+SQL statements of every page with a `before_cursor_execute` listener.
+Fails if any page takes more than 2 statements (orders + their items in one
+`selectinload`): an N+1 / lazy-load regression shows up as ~limit extra
+queries. Also prints the time per page.
+
+Uses DATABASE_URL when set, otherwise a throw-away SQLite file.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/order_history_queries.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import event  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.permissions import CurrentUser  # noqa: E402
+from app.models.order import Order, OrderItem, OrderStatus  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.schemas.order import OrderResponse  # noqa: E402
+from app.services.order_service import OrderService  # noqa: E402
+
+MAX_QUERIES = 2
+
+
+def setup(orders: int, items: int) -> CurrentUser:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        buyer = User(
+            email=f"history-{time.time_ns()}@example.com", password="x",
+            first_name="Bench", last_name="Buyer", role=UserRole.BUYER,
+        )
+        db.add(buyer)
+        db.flush()
+        for n in range(orders):
+            db.add(Order(
+                buyer_id=buyer.id,
+                status=OrderStatus.PAID if n % 2 else OrderStatus.PENDING,
+                total_price=10.0 * items,
+                items=[OrderItem(quantity=1, price_at_time=10.0, subtotal=10.0) for _ in range(items)],
+            ))
+        db.commit()
+        return CurrentUser(id=buyer.id, role=buyer.role, is_active=True, is_verified=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=120)
+    parser.add_argument("--items", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    buyer = setup(args.orders, args.items)
+    statements: list[str] = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    failed = False
+    cursor, page, seen = None, 0, 0
+    while True:
+        statements.clear()
+        start = time.perf_counter()
+        with SessionLocal() as db:
+            orders, cursor, _ = OrderService.get_user_orders(db, buyer, args.limit, cursor)
+            body = [OrderResponse.model_validate(o) for o in orders]
+        elapsed = time.perf_counter() - start
+        page += 1
+        seen += len(body)
+        lines = sum(len(o.items) for o in body)
+        print(f"page {page}: {len(body):>3} orders, {lines:>4} items, {len(statements)} queries, {elapsed * 1000:.1f} ms")
+        if len(statements) > MAX_QUERIES:
+            failed = True
+            for statement in statements:
+                print("   ", " ".join(statement.split())[:120])
+        if cursor is None:
+            break
+
+    event.remove(engine, "before_cursor_execute", count)
+    if seen != args.orders:
+        sys.exit(f"FAILED: walked {seen} orders, expected {args.orders}")
+    if failed:
+        sys.exit(f"FAILED: a page took more than {MAX_QUERIES} queries (lazy load / N+1)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-request cost of the rate limiter as the number of distinct clients grows.
+
+    python benchmarks/rate_limit.py [--requests 500000] [--max-requests 120]
+
+Compares the former per-IP timestamp lists with SlidingWindowLimiter. Each
+run spreads `--requests` hits over N distinct IPs (1k → 100k) and prints
+the mean cost per hit and the number of keys left in memory. The limiter's
+cost stays flat; the list store grows with the limit and never shrinks.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", "sqlite://")   # settings are required at import, unused here
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.middleware.rate_limit_backends import SlidingWindowLimiter  # noqa: E402
+
+CLIENTS = (1_000, 10_000, 100_000)
+
+
+class TimestampLists:
+    """The previous implementation, minus the HTTP plumbing."""
+
+    def __init__(self, max_requests: int, window_seconds: int):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self._store: dict[str, list[float]] = defaultdict(list)
+
+    def hit(self, key: str, now: float) -> bool:
+        window_start = now - self.window_seconds
+        self._store[key] = [t for t in self._store[key] if t > window_start]
+        if len(self._store[key]) >= self.max_requests:
+            return False
+        self._store[key].append(now)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+
+def run(limiter, ips: list[str], requests: int) -> float:
+    keys = [random.choice(ips) for _ in range(requests)]
+    now = time.time()
+    start = time.perf_counter()
+    for i, key in enumerate(keys):
+        limiter.hit(key, now + i * 1e-4)   # ~10k req/s of simulated time
+    return (time.perf_counter() - start) / requests * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500_000)
+    parser.add_argument("--max-requests", type=int, default=120)
+    parser.add_argument("--window", type=int, default=60)
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'implementation':>16} {'ns/hit':>8} {'keys kept':>10}")
+    for clients in CLIENTS:
+        ips = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(clients)]
+        for name, limiter in (
+            ("timestamp lists", TimestampLists(args.max_requests, args.window)),
+            ("sliding window", SlidingWindowLimiter(args.max_requests, args.window)),
+        ):
+            cost = run(limiter, ips, args.requests)
+            print(f"{clients:>8} {name:>16} {cost:>8.0f} {len(limiter):>10}")
+
+
+if __name__ == "__main__":
+    main()
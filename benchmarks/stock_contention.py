@@ -0,0 +1,170 @@
+"""
+Oversell check and throughput for concurrent checkouts.
+
+    python benchmarks/stock_contention.py [--checkouts 200] [--stock 50] [--threads 32] [--reserve-only]
+
+Fires `--checkouts` parallel `OrderService.checkout` calls, one per buyer
+whose cart holds one unit of a single product with `--stock` units, each in
+its own session (Stripe is stubbed: the PaymentIntent is a local object).
+Verifies that exactly `--stock` checkouts succeed, that the stock ends at 0
+(never negative), that every surviving order is PENDING with its intent,
+its payment row and its unit reserved (no order without its reservation, no
+reservation without its order), and that the facet aggregate agrees; then
+prints checkouts/sec. `--reserve-only` hammers `reserve_stock` alone.
+
+Uses DATABASE_URL when set (run it against PostgreSQL for real row-lock
+contention), otherwise a throw-away SQLite file.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/stock_contention.db")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("STRIPE_SECRET_KEY", "sk_test_benchmark")   # checkout refuses to run without one
+
+from types import SimpleNamespace  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from app.core.database import Base, SessionLocal, engine  # noqa: E402
+from app.core.permissions import CurrentUser  # noqa: E402
+from app.models.cart import Cart, CartItem  # noqa: E402
+from app.models.facet import ProductFacet  # noqa: E402
+from app.models.order import Order, OrderItem, Payment, OrderStatus  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.services.facet_service import FacetService  # noqa: E402
+from app.services.order_service import OrderService  # noqa: E402
+
+
+def _fake_intent(order_id: int, user_id: int, total: float):
+    return SimpleNamespace(id=f"pi_bench_{order_id}", client_secret=f"pi_bench_{order_id}_secret")
+
+
+OrderService._create_intent = staticmethod(_fake_intent)
+
+
+def setup(stock: int, buyers: int) -> tuple[int, list[CurrentUser]]:
+    Base.metadata.create_all(bind=engine)
+    run = time.time_ns()
+    with SessionLocal() as db:
+        seller = db.query(User).filter(User.email == "contention@example.com").first()
+        if seller is None:
+            seller = User(email="contention@example.com", password="x", first_name="Bench", last_name="Seller", role=UserRole.SELLER)
+            db.add(seller)
+            db.flush()
+        product = Product(name="Hot item", price=19.9, stock=stock, seller_id=seller.id)
+        db.add(product)
+        db.flush()
+        users = []
+        for n in range(buyers):
+            buyer = User(email=f"buyer-{run}-{n}@example.com", password="x", first_name="Bench", last_name="Buyer", role=UserRole.BUYER)
+            db.add(buyer)
+            db.flush()
+            db.add(Cart(user_id=buyer.id, items=[CartItem(product_id=product.id, quantity=1, price_at_time=product.price)]))
+            users.append(CurrentUser(id=buyer.id, role=UserRole.BUYER, is_active=True, is_verified=True))
+        FacetService.rebuild(db)
+        db.commit()
+        return product.id, users
+
+
+def checkout(user: CurrentUser) -> bool:
+    with SessionLocal() as db:
+        try:
+            OrderService.checkout(db, user)
+            return True
+        except HTTPException:
+            db.rollback()
+            return False
+
+
+def reserve(product_id: int) -> bool:
+    with SessionLocal() as db:
+        try:
+            OrderService.reserve_stock(db, {product_id: 1})
+            db.commit()
+            return True
+        except HTTPException:
+            db.rollback()
+            return False
+
+
+def check_orders(db, product_id: int, succeeded: int, reserved: int) -> list[str]:
+    """Orders of this run's product must match the checkouts and the stock taken, one for one."""
+    problems = []
+    orders = (
+        db.query(Order.id, Order.status, Order.stripe_payment_intent_id, Payment.id.label("payment_id"))
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Payment, Payment.order_id == Order.id)
+        .filter(OrderItem.product_id == product_id)
+        .all()
+    )
+    if len(orders) != succeeded:
+        problems.append(f"{len(orders)} orders for {succeeded} successful checkouts")
+    for order in orders:
+        if order.status != OrderStatus.PENDING or order.stripe_payment_intent_id is None or order.payment_id is None:
+            problems.append(f"order {order.id}: {order.status.value}, intent={order.stripe_payment_intent_id}, payment={order.payment_id}")
+    ordered = sum(
+        q for (q,) in db.query(OrderItem.quantity)
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(OrderItem.product_id == product_id, Order.status == OrderStatus.PENDING)
+    )
+    if ordered != reserved:
+        problems.append(f"{ordered} units in PENDING orders but {reserved} taken from stock")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkouts", type=int, default=200)
+    parser.add_argument("--stock", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--reserve-only", action="store_true", help="only reserve_stock, no order / checkout")
+    args = parser.parse_args()
+
+    product_id, users = setup(args.stock, 0 if args.reserve_only else args.checkouts)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        if args.reserve_only:
+            results = list(pool.map(reserve, [product_id] * args.checkouts))
+        else:
+            results = list(pool.map(checkout, users))
+    elapsed = time.perf_counter() - start
+
+    with SessionLocal() as db:
+        final_stock = db.query(Product.stock).filter(Product.id == product_id).scalar()
+        live = FacetService.live_counts(db)
+        stored = {
+            (f.category, f.seller_id, f.price_bucket, f.in_stock): f.count
+            for f in db.query(ProductFacet).filter(ProductFacet.count != 0)
+        }
+        facets_ok = stored == {k: v for k, v in live.items() if v}
+        in_stock = db.query(func.sum(ProductFacet.count)).filter(ProductFacet.in_stock == True).scalar()
+        succeeded = sum(results)
+        problems = [] if args.reserve_only else check_orders(db, product_id, succeeded, args.stock - final_stock)
+
+    what = "reservations" if args.reserve_only else "checkouts"
+    print(f"{what + ' ok':<20}: {succeeded} / {args.checkouts} (expected {min(args.stock, args.checkouts)})")
+    print(f"final stock         : {final_stock} (expected {max(args.stock - args.checkouts, 0)})")
+    print(f"facets consistent   : {facets_ok} (in-stock products: {in_stock})")
+    if not args.reserve_only:
+        print(f"orders consistent   : {not problems}")
+        for problem in problems[:10]:
+            print(f"    {problem}")
+    print(f"throughput          : {args.checkouts / elapsed:.0f} {what}/s ({args.threads} threads)")
+    if (
+        succeeded != min(args.stock, args.checkouts)
+        or final_stock != max(args.stock - args.checkouts, 0)
+        or not facets_ok
+        or problems
+    ):
+        sys.exit("FAILED: oversold or inconsistent")
+
+
+if __name__ == "__main__":
+    main()
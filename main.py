@@ -4,22 +4,50 @@ from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from pathlib import Path
 
+import anyio.to_thread
+
 from app.core.config import settings
-from app.core.database import Base, engine
+from app.core.database import Base, engine, SessionLocal
 from app.api.router import api_router
 from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.metrics import RequestMetricsMiddleware
 from app.core.stripe_client import init_stripe
+from app.core import background, schema
+from app.services.search_service import SearchService
+from app.services.facet_service import FacetService
+from app.services.sales_service import SalesService
+from app.services.token_service import TokenService
+from app.services.order_service import OrderService
+from app.services.idempotency_service import IdempotencyService
+from app.services.webhook_service import WebhookService
+from app.services.reservation_service import ReservationService
 
 import app.models  # noqa: F401
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Startup: créer dossiers, tables DB, init Stripe."""
+    """Startup: créer dossiers, tables DB, index de recherche, init Stripe, tâches de fond."""
     Path("media/products").mkdir(parents=True, exist_ok=True)
+    # Threadpool des routes sync : sa taille borne aussi le hachage (voir app.core.security)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
     Base.metadata.create_all(bind=engine)
+    schema.upgrade(engine)   # index / colonnes ajoutés après coup (create_all ignore les tables existantes)
+    SearchService.init(engine)
+    FacetService.init(engine)
+    SalesService.init(engine)
     init_stripe()
+    with SessionLocal() as db:
+        TokenService.sync(db)
+    background.schedule("token-revocations", settings.TOKEN_REVOCATION_SYNC_SECONDS, TokenService.sync_job)
+    background.schedule("token-revocations-purge", 3600, TokenService.purge_job)
+    background.schedule("checkout-recovery", settings.CHECKOUT_RECOVERY_INTERVAL, OrderService.recover_checkouts_job)
+    background.schedule("idempotency-keys-purge", 3600, IdempotencyService.purge_job)
+    background.schedule("webhook-inbox", settings.WEBHOOK_POLL_INTERVAL, WebhookService.drain_job)
+    background.schedule("reservation-sweeper", settings.RESERVATION_SWEEP_INTERVAL, ReservationService.sweep_job)
+    background.start_all()
     yield
+    background.stop_all()
 
 
 app = FastAPI(
@@ -33,8 +61,10 @@ app = FastAPI(
 
 # ── Middleware ──────────────────────────────────────────────────────────────────
 # ⚠️ Ordre inverse : le dernier ajouté s'exécute en premier
+# Middlewares ASGI purs (pas de BaseHTTPMiddleware : coût par requête, casse le streaming)
 # RateLimit ajouté en premier → s'exécute en dernier
-app.add_middleware(RateLimitMiddleware, max_requests=120, window_seconds=60)
+app.add_middleware(RateLimitMiddleware)   # règles : app.middleware.rate_limit.default_rules
+app.add_middleware(RequestMetricsMiddleware)   # compte aussi les 429
 
 # CORS ajouté en dernier → s'exécute en premier ✅
 app.add_middleware(
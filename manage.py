@@ -0,0 +1,88 @@
+"""
+Command-line tasks.
+
+    python manage.py export --format ndjson --gzip -o catalogue.ndjson.gz
+    python manage.py rebuild-facets
+    python manage.py rebuild-rollups
+    python manage.py sweep-reservations [--ttl 1800] [--no-stripe]
+"""
+import argparse
+import sys
+
+from app.core.database import SessionLocal
+from app.services.export_service import ExportService
+from app.services.facet_service import FacetService
+from app.services.reservation_service import ReservationService
+from app.services.sales_service import SalesService
+
+import app.models  # noqa: F401
+
+
+def export(args: argparse.Namespace) -> None:
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    with SessionLocal() as db:
+        chunks = ExportService.iter_products(db, args.format, args.category, args.seller_id)
+        if args.gzip:
+            chunks = ExportService.gzip_stream(chunks)
+        for chunk in chunks:
+            out.write(chunk)
+    out.flush()
+    if args.output:
+        out.close()
+
+
+def rebuild_facets(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        FacetService.rebuild(db)
+        db.commit()
+    print("product_facets rebuilt")
+
+
+def rebuild_rollups(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        SalesService.rebuild(db)
+        db.commit()
+    print("sales_rollups rebuilt")
+
+
+def sweep_reservations(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        report = ReservationService.sweep(db, args.ttl, cancel_intent=(lambda _: "canceled") if args.no_stripe else None)
+    print(
+        f"{report.orders_cancelled} orders cancelled, {report.units_released} units released "
+        f"over {report.products} products, {report.orders_settled} paid orders settled, "
+        f"{report.intents_kept} intents kept, {report.errors} errors"
+    )
+    for product_id, units in sorted(report.released.items()):
+        print(f"  product {product_id}: +{units}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SaaS Platform maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("export", help="Export the active catalogue (NDJSON or CSV)")
+    p.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    p.add_argument("--category")
+    p.add_argument("--seller-id", type=int)
+    p.add_argument("--gzip", action="store_true", help="gzip the output")
+    p.add_argument("-o", "--output", help="output file (default: stdout)")
+    p.set_defaults(func=export)
+
+    p = commands.add_parser("rebuild-facets", help="Recompute the product_facets aggregate from products")
+    p.set_defaults(func=rebuild_facets)
+
+    p = commands.add_parser("rebuild-rollups", help="Recompute the sales_rollups aggregate from orders and refunds")
+    p.set_defaults(func=rebuild_rollups)
+
+    p = commands.add_parser("sweep-reservations", help="Cancel unpaid PENDING orders and release their stock")
+    p.add_argument("--ttl", type=int, help="age in seconds (default: PENDING_ORDER_TTL)")
+    p.add_argument("--no-stripe", action="store_true", help="don't call Stripe (dev: every intent counts as cancelled)")
+    p.set_defaults(func=sweep_reservations)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()